@@ -1,157 +1,200 @@
-﻿import hashlib
-import time
+﻿import asyncio
+import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import APIRouter, FastAPI, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import FileResponse, ORJSONResponse
+from fastapi.security import OAuth2PasswordRequestForm
 from typing import Optional, List
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 # Импорты из наших модулей
-from app.database.config import get_db, Base, engine, SessionLocal
+from app.database.config import get_db, get_read_db, get_read_db_for_user, mark_write, init_db
+from app.database.migrate import schema_is_current
 from app.models.user import User
 from app.models.account import Account
-from app.services.crud.user import create_user, authenticate_user, get_all_users
-from app.services.crud.account import withdraw_from_account
-
-# ========== SCHEMAS (оставляем здесь из-за проблем с файлами) ==========
-class UserBase(BaseModel):
-    username: str
-    email: EmailStr
-    full_name: Optional[str] = None
-
-class UserCreate(UserBase):
-    password: str
-
-class UserResponse(UserBase):
-    id: int
-    is_active: bool
-    is_admin: bool
-    created_at: datetime
-    
-    class Config:
-        from_attributes = True
-
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-
-class AccountBalance(BaseModel):
-    balance: float
-    credit_limit: float
-
-class PredictionRequest(BaseModel):
-    text: str
-    model_type: Optional[str] = "default"
-
-class PredictionResponse(BaseModel):
-    id: int
-    user_id: int
-    input_text: str
-    summary: str
-    model_used: str
-    cost: float
-    processing_time: float
-    created_at: datetime
-# ========== END SCHEMAS ==========
-
-# JWT настройки (должны быть в auth.py, но оставляем здесь для простоты)
-SECRET_KEY = "your-secret-key-change-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    db = SessionLocal()
-    user = db.query(User).filter(User.username == username).first()
-    db.close()
-    if user is None:
-        raise credentials_exception
-    return user
+from app.models.prediction import Prediction
+from app.models.transaction import Transaction
+from app.models.export_job import ExportJob
+from app.schemas.user import (
+    UserCreate, UserResponse, Token, RefreshRequest, AccountBalance, TransactionResponse, UsageRow, LedgerUsageRow,
+)
+from app.schemas.prediction import (
+    PredictionRequest, PredictionResponse, BatchRequest, BatchResponse, SearchResult,
+    ExportRequest, ExportJobResponse,
+)
+from app.settings import Settings
+from app.services.crud.user import create_user, authenticate_user, deactivate_user
+from app.services.crud.refresh_token import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+from app.services.crud.account import deposit_to_account
+from app.services.revocation import revoke_token
+from app.services.auth import (
+    CurrentUser,
+    create_access_token,
+    token_claims,
+    get_current_user,
+    get_current_active_user,
+    get_current_admin_user,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+)
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.services.export import (
+    DATASETS,
+    MEDIA_TYPES,
+    available_formats,
+    create_export_job,
+    has_active_export,
+    export_path,
+    export_filename,
+    run_export,
+)
+from app.services.prediction import summarize_for_user, summarize_batch_for_user, SummarizationFailed
+from app.services.deadline import (
+    Deadline, DeadlineExceeded, RequestAborted, RequestCancelled, REQUEST_TIMEOUT_HEADER,
+    request_timeout, run_with_deadline,
+)
+from app.services.pricing import RequestTooLargeError
+from app.services.http_cache import make_etag, etag_matches, cache_headers, not_modified
+from app.services.search import search_predictions, SEARCH_FIELDS
+from app.services.serialization import rows_response, rows_to_dicts
+from app.services.text_store import load_input, load_inputs
+from app.services.usage import LEDGER_ROLLUP_NAME, usage_report, ledger_report, refresh_usage_rollups, rollup_status
+from app.services.maintenance import maintenance_loop
+from app.services.summarizer import load_models, drain, in_flight, set_backend
+from app.services.resilience import BackendUnavailable, guards_stats
+from app.services.text_features import cache_stats
+from app.services import access_log, tracing
+
+# Поля ответов для прямой сериализации строк БД (без ORM-объектов и pydantic)
+PREDICTION_FIELDS = list(PredictionResponse.model_fields)
+PREDICTION_COLUMNS = [f for f in PREDICTION_FIELDS if f != "input_text"]
+USER_FIELDS = list(UserResponse.model_fields)
+EXPORT_JOB_FIELDS = list(ExportJobResponse.model_fields)
+
+# Эндпоинты; приложение с middleware и lifespan собирает create_app
+router = APIRouter()
+
+# Сессия для чтения (реплика / read-only пул) с защитой read-your-writes
+def get_user_read_db(current_user: CurrentUser = Depends(get_current_active_user)):
+    yield from get_read_db_for_user(current_user.id)
+
+def prediction_response(prediction: Prediction, input_text: Optional[str] = None) -> dict:
+    data = {f: getattr(prediction, f) for f in PREDICTION_COLUMNS}
+    data["input_text"] = input_text
+    return data
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
-
-# Простая функция хэширования
-def get_password_hash(password: str) -> str:
-    salt = "sci_summ_salt"
-    return hashlib.sha256(f"{password}{salt}".encode()).hexdigest()
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return get_password_hash(plain_password) == hashed_password
-
-# Функция суммаризации (заглушка)
-def summarize_text(text: str, model_type: str = "default") -> str:
-    time.sleep(1)  # Имитация обработки
-    if len(text) < 100:
-        return text[:50] + "..."
-    sentences = text.split('.')
-    if len(sentences) > 3:
-        summary = '. '.join(sentences[:3]) + '.'
-    else:
-        summary = text[:150] + "..."
-    return summary
-
-# ========== LIFESPAN для создания таблиц при старте ==========
+def export_job_response(job: ExportJob) -> dict:
+    data = {f: getattr(job, f) for f in EXPORT_JOB_FIELDS if f != "download_url"}
+    data["download_url"] = str(router.url_path_for("download_export", job_id=job.id)) if job.status == "done" else None
+    return data
+
+# ========== LIFESPAN ==========
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Создаем таблицы при старте (ВЫПОЛНЯЕМ ТРЕБОВАНИЕ №4)
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    settings = app.state.settings
+    app.state.ready = False
+    if settings.auto_create_schema:
+        print("Creating database tables...")
+        init_db()
     
     # Можно добавить создание администратора здесь
     # print("Checking admin user...")
     
+    # Под gunicorn модели загружает мастер (on_starting в gunicorn.conf.py), а конфиг
+    # выставляет PRELOAD_MODELS=0, чтобы воркеры не грузили их повторно
+    if settings.preload_models:
+        load_models()
+    # Поток записи access-лога запускается в каждом воркере (после fork)
+    if settings.access_log:
+        access_log.start()
+    if settings.tracing:
+        tracing.start()
+    # Rollup использования и возврат зависших резервов — фоновой задачей воркера
+    maintenance = None
+    if settings.maintenance_interval > 0:
+        maintenance = asyncio.create_task(maintenance_loop(settings.maintenance_interval))
+    app.state.ready = True
+    
     yield
+    app.state.ready = False
     print("Application shutting down...")
+    if maintenance is not None:
+        maintenance.cancel()
+    # Даем завершиться начатым суммаризациям, чтобы не потерять оплаченные запросы
+    if not await run_in_threadpool(drain, settings.shutdown_drain_timeout):
+        print("Shutdown drain timeout, some summarizations were interrupted")
+    await run_in_threadpool(tracing.stop)
+    await run_in_threadpool(access_log.stop)
 
-# Создаем приложение FastAPI с lifespan
-app = FastAPI(
-    title="Sci-Summ API",
-    description="REST API for Scientific Articles Summarization System",
-    version="1.0.0",
-    lifespan=lifespan
-)
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    # Единственная сборка приложения: gunicorn и uvicorn запускают app.api:app = create_app(),
+    # бенчмарки и проверки передают свои Settings
+    settings = settings or Settings()
+    # Бэкенд суммаризатора общий для процесса
+    set_backend(settings.summarizer)
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    app = FastAPI(
+        title="Sci-Summ API",
+        description="REST API for Scientific Articles Summarization System",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+    app.state.settings = settings
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Отметка о недавней записи едет с клиентом: чтения после записи идут в основную БД
+    # в любом воркере
+    if settings.read_replica:
+        app.add_middleware(ReadYourWritesMiddleware)
+
+    # Сжатие ответов: история и пакетные результаты хорошо сжимаются,
+    # мелкие ответы (баланс) ниже порога отдаются как есть
+    if settings.compression:
+        app.add_middleware(CompressionMiddleware)
+
+    # Серверный спан трассировки охватывает сжатие и все стадии запроса
+    if settings.tracing:
+        app.add_middleware(TracingMiddleware, sample_rate=settings.trace_sample_rate)
+
+    # Access-лог — самый внешний слой: время ответа включает сжатие
+    if settings.access_log:
+        app.add_middleware(AccessLogMiddleware)
+
+    # Без реплики все чтения идут в основную БД
+    if not settings.read_replica:
+        app.dependency_overrides[get_read_db] = get_db
+        app.dependency_overrides[get_user_read_db] = get_db
+
+    app.include_router(router)
+    return app
 
 # ========== ENDPOINTS ==========
-@app.post("/auth/register", response_model=UserResponse)
+def issue_tokens(db: Session, user: User, refresh_token: Optional[str] = None) -> dict:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # id и роль кладем в токен, чтобы проверка запросов обходилась без БД
+    access_token = create_access_token(
+        data=token_claims(user), expires_delta=access_token_expires
+    )
+    if refresh_token is None:
+        refresh_token = issue_refresh_token(db, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/auth/register", response_model=UserResponse)
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
     user = create_user(db, user_data.dict())
     if not user:
@@ -159,31 +202,52 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered"
         )
+    access_log.audit("auth.register", user_id=user.id, username=user.username)
     return user
 
-@app.post("/auth/login", response_model=Token)
+@router.post("/auth/login", response_model=Token)
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        access_log.audit("auth.login_failed", username=form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_log.audit("auth.login", user_id=user.id, username=user.username)
+    return issue_tokens(db, user)
+
+@router.post("/auth/refresh", response_model=Token)
+def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    # Обмен refresh-токена на новую пару без пароля и bcrypt; старый токен отзывается
+    rotated = rotate_refresh_token(db, request.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user, new_refresh_token = rotated
+    return issue_tokens(db, user, new_refresh_token)
+
+@router.post("/auth/logout")
+def logout(request: RefreshRequest, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Отзываются и refresh-цепочка, и текущий access-токен (во всех воркерах, см. app.services.revocation)
+    revoke_refresh_token(db, request.refresh_token)
+    revoke_token(db, current_user.jti, current_user.expires_at)
+    access_log.audit("auth.logout", user_id=current_user.id)
+    return {"message": "Logged out"}
 
-@app.get("/auth/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return current_user
+@router.get("/auth/me", response_model=UserResponse)
+def read_users_me(current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_user_read_db)):
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
-@app.get("/accounts/balance", response_model=AccountBalance)
-def get_balance(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+@router.get("/accounts/balance", response_model=AccountBalance)
+def get_balance(current_user: CurrentUser = Depends(get_current_active_user), db: Session = Depends(get_user_read_db)):
     account = db.query(Account).filter(Account.user_id == current_user.id).first()
     
     if not account:
@@ -191,14 +255,16 @@ def get_balance(current_user: User = Depends(get_current_active_user), db: Sessi
     
     return {
         "balance": account.balance,
-        "credit_limit": account.credit_limit
+        "credit_limit": account.credit_limit,
+        # held копит погрешность float после серии резервов и списаний
+        "held": round(account.held, 4),
     }
 
-@app.post("/accounts/deposit")
+@router.post("/accounts/deposit")
 def deposit(
     amount: float,
     description: str = "Deposit",
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     if amount <= 0:
@@ -208,61 +274,338 @@ def deposit(
     if not account:
         account = Account(user_id=current_user.id, balance=0.0)
         db.add(account)
+        db.flush()
     
-    account.balance += amount
-    db.commit()
+    deposit_to_account(db, account, amount, description)
+    mark_write(current_user.id)
+    access_log.audit("accounts.deposit", amount=amount, balance=account.balance)
     
     return {"message": f"Successfully deposited {amount}", "new_balance": account.balance}
 
-@app.post("/predictions/summarize", response_model=PredictionResponse)
-def create_prediction(
+# Клиент отключился до ответа (как 499 у nginx): ответ уже никто не прочитает
+STATUS_CLIENT_CLOSED_REQUEST = 499
+
+def request_deadline(request: Request, *model_types: str) -> Deadline:
+    # Срок из заголовка X-Request-Timeout, не больше умолчания самой медленной из моделей
+    header = request.headers.get(REQUEST_TIMEOUT_HEADER)
+    try:
+        return Deadline(max(request_timeout(header, model_type) for model_type in model_types))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def aborted_request_error(e: RequestAborted) -> HTTPException:
+    if isinstance(e, RequestCancelled):
+        return HTTPException(status_code=STATUS_CLIENT_CLOSED_REQUEST, detail=str(e))
+    return HTTPException(status_code=504, detail=str(e))
+
+@router.post("/predictions/summarize", response_model=PredictionResponse)
+async def create_prediction(
+    request: Request,
     prediction_data: PredictionRequest,
-    current_user: User = Depends(get_current_active_user),
+    include_input: bool = True,
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    # Проверяем баланс
-    account = db.query(Account).filter(Account.user_id == current_user.id).first()
-    if not account:
-        raise HTTPException(status_code=400, detail="Account not found")
-    
-    cost = 1.0
-    if account.balance < cost:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Insufficient balance. Required: {cost}, Available: {account.balance}"
+    # Работа идет в пуле потоков под сроком запроса; отключение клиента ее отменяет
+    deadline = request_deadline(request, prediction_data.model_type)
+    try:
+        prediction = await run_with_deadline(
+            request, deadline, summarize_for_user,
+            db, current_user.id, prediction_data.text, prediction_data.model_type,
         )
+    except RequestAborted as e:
+        raise aborted_request_error(e)
+    except SummarizationFailed as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RequestTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # ========== ВЫПОЛНЯЕМ ТРЕБОВАНИЕ №3: используем withdraw_from_account ==========
+    return prediction_response(prediction, prediction_data.text if include_input else None)
+
+@router.post("/predictions/batch", response_model=BatchResponse)
+async def create_predictions_batch(
+    request: Request,
+    batch: BatchRequest,
+    include_input: bool = False,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    # Пачка оплачивается одним резервом; ошибка отдельной заявки не отменяет остальные.
+    items = [(item.text, item.model_type) for item in batch.items]
+    deadline = request_deadline(request, "default", *{model_type for _, model_type in items})
     try:
-        withdraw_from_account(db, account.id, cost, f"Payment for prediction: {prediction_data.model_type}")
+        results, hold = await run_with_deadline(request, deadline, summarize_batch_for_user, db, current_user.id, items)
+    except RequestAborted as e:
+        raise aborted_request_error(e)
+    except RequestTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    # Выполняем суммаризацию
-    start_time = time.time()
-    summary = summarize_text(prediction_data.text, prediction_data.model_type)
-    processing_time = time.time() - start_time
-    
-    return PredictionResponse(
-        id=1,
-        user_id=current_user.id,
-        input_text=prediction_data.text,
-        summary=summary,
-        model_used=prediction_data.model_type,
-        cost=cost,
-        processing_time=processing_time,
-        created_at=datetime.now()
+    response_items = []
+    for index, (result, item) in enumerate(zip(results, batch.items)):
+        if isinstance(result, Prediction):
+            response_items.append({
+                "index": index,
+                "prediction": prediction_response(result, item.text if include_input else None),
+            })
+        elif isinstance(result, DeadlineExceeded):
+            response_items.append({"index": index, "error": "Deadline exceeded"})
+        elif isinstance(result, BackendUnavailable):
+            response_items.append({"index": index, "error": str(result)})
+        else:
+            response_items.append({"index": index, "error": "Summarization failed"})
+    return {"items": response_items, "held": hold.amount, "total_cost": hold.captured_amount}
+
+@router.get("/accounts/transactions", response_model=List[TransactionResponse])
+def get_transactions(
+    limit: int = 50,
+    offset: int = 0,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_user_read_db)
+):
+    account = db.query(Account).filter(Account.user_id == current_user.id).first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return (
+        db.query(Transaction)
+        .filter(Transaction.account_id == account.id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .offset(offset)
+        .limit(min(limit, 500))
+        .all()
+    )
+
+@router.get("/predictions/history", response_model=List[PredictionResponse])
+def get_prediction_history(
+    limit: int = 20,
+    offset: int = 0,
+    include_input: bool = False,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_user_read_db)
+):
+    # Горячий эндпоинт: выбираем только нужные колонки и сериализуем строки напрямую
+    # По умолчанию только превью текста; полный текст — include_input=true или /predictions/{id}/input
+    rows = (
+        db.query(Prediction.input_hash, *[getattr(Prediction, f) for f in PREDICTION_COLUMNS])
+        .filter(Prediction.user_id == current_user.id)
+        .order_by(Prediction.created_at.desc(), Prediction.id.desc())
+        .offset(offset)
+        .limit(min(limit, 500))
+        .all()
+    )
+    texts = load_inputs(db, [row[0] for row in rows]) if include_input else {}
+    items = rows_to_dicts([row[1:] for row in rows], PREDICTION_COLUMNS)
+    for item, row in zip(items, rows):
+        item["input_text"] = texts.get(row[0])
+    return ORJSONResponse(items)
+
+@router.get("/predictions/search", response_model=List[SearchResult])
+def search_predictions_endpoint(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_user_read_db)
+):
+    # Полнотекстовый поиск по своим суммаризациям (FTS5 / tsvector), с ранжированием
+    rows = search_predictions(db, current_user.id, q, min(limit, 100), offset)
+    return rows_response(rows, SEARCH_FIELDS)
+
+@router.get("/predictions/{prediction_id}", response_model=PredictionResponse)
+def get_prediction(
+    prediction_id: int,
+    request: Request,
+    include_input: bool = True,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_user_read_db)
+):
+    # Сначала только хэш результата: на If-None-Match отвечаем 304 без загрузки и сериализации
+    stored_hash = db.query(Prediction.result_hash).filter(
+        Prediction.id == prediction_id, Prediction.user_id == current_user.id
+    ).first()
+    if stored_hash is None:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    etag = make_etag(stored_hash[0], "-i" if include_input else "-n") if stored_hash[0] else None
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
+    input_text = load_input(db, prediction.input_hash) if include_input else None
+    headers = cache_headers(etag) if etag else None
+    return ORJSONResponse(
+        jsonable_encoder(prediction_response(prediction, input_text)), headers=headers
+    )
+
+@router.get("/predictions/{prediction_id}/input")
+def get_prediction_input(
+    prediction_id: int,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_user_read_db)
+):
+    input_hash = db.query(Prediction.input_hash).filter(
+        Prediction.id == prediction_id, Prediction.user_id == current_user.id
+    ).scalar()
+    if input_hash is None:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    # Входной текст неизменен и адресуется своим хэшем
+    etag = make_etag(input_hash)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return ORJSONResponse(
+        {"prediction_id": prediction_id, "input_text": load_input(db, input_hash)},
+        headers=cache_headers(etag),
     )
 
-@app.get("/users", response_model=List[UserResponse])
-def get_users(db: Session = Depends(get_db)):
-    users = get_all_users(db)
-    return users
+@router.post("/exports", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_export(
+    export_data: ExportRequest,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    # Выгрузка всей истории строится в фоне потоково; клиент опрашивает GET /exports/{id}
+    if export_data.dataset not in DATASETS:
+        raise HTTPException(status_code=400, detail=f"dataset must be one of: {', '.join(DATASETS)}")
+    if export_data.format not in available_formats():
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(available_formats())}")
+    if has_active_export(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Another export is already in progress")
+    job = create_export_job(
+        db, current_user.id, export_data.dataset, export_data.format, export_data.include_input
+    )
+    background_tasks.add_task(run_export, job.id, request.app.state.settings.read_replica)
+    return export_job_response(job)
+
+def get_user_export(db: Session, job_id: str, user_id: int) -> ExportJob:
+    job = db.query(ExportJob).filter(ExportJob.id == job_id, ExportJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return job
+
+@router.get("/exports/{job_id}", response_model=ExportJobResponse)
+def get_export(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    # Статус читается из основной БД: фоновая задача пишет его туда же
+    return export_job_response(get_user_export(db, job_id, current_user.id))
+
+@router.get("/exports/{job_id}/download", name="download_export")
+def download_export(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    job = get_user_export(db, job_id, current_user.id)
+    if job.status == "expired":
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    path = export_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    # FileResponse отдает файл кусками, в память он целиком не читается
+    return FileResponse(path, media_type=MEDIA_TYPES[job.format], filename=export_filename(job))
+
+# ========== ADMIN ==========
+@router.get("/admin/usage", response_model=List[UsageRow])
+def get_usage(
+    period: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = "bucket",
+    user_id: Optional[int] = None,
+    model: Optional[str] = None,
+    limit: int = 1000,
+    admin: CurrentUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    # Только rollup-таблицы: стоимость не зависит от объема сырых предсказаний.
+    # Данные отстают от записи на интервал фоновой задачи (MAINTENANCE_INTERVAL)
+    try:
+        return usage_report(db, period, start, end, group_by, user_id, model, min(limit, 10000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/admin/usage/ledger", response_model=List[LedgerUsageRow])
+def get_ledger_usage(
+    period: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = "bucket",
+    user_id: Optional[int] = None,
+    type: Optional[str] = None,
+    limit: int = 1000,
+    admin: CurrentUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    # Движение средств по журналу операций — тоже только из rollup-таблицы
+    try:
+        return ledger_report(db, period, start, end, group_by, user_id, type, min(limit, 10000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/admin/usage/refresh")
+def refresh_usage(
+    admin: CurrentUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    # Досчитать rollup сейчас, не дожидаясь фоновой задачи
+    processed = refresh_usage_rollups(db)
+    access_log.audit("admin.usage_refresh", processed=processed)
+    return {"processed": processed, **rollup_status(db), "ledger": rollup_status(db, LEDGER_ROLLUP_NAME)}
+
+@router.post("/admin/users/{user_id}/deactivate", response_model=UserResponse)
+def deactivate(
+    user_id: int,
+    admin: CurrentUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    # Новые токены несут act=false, refresh закрыт; уже выданные access-токены отзываются
+    user = deactivate_user(db, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    access_log.audit("admin.deactivate_user", target_user_id=user_id)
+    return user
+
+@router.get("/users", response_model=List[UserResponse])
+def get_users(db: Session = Depends(get_read_db)):
+    rows = db.query(*[getattr(User, f) for f in USER_FIELDS]).order_by(User.id).all()
+    return rows_response(rows, USER_FIELDS)
 
-@app.get("/")
+@router.get("/")
 def read_root():
     return {"message": "Welcome to Sci-Summ API"}
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
+    # Liveness: процесс жив, без обращения к БД
     return {"status": "healthy"}
+
+@router.get("/metrics")
+def metrics():
+    # Состояние воркера: breaker и bulkhead каждого бэкенда модели, кэш признаков, single-flight.
+    # Без авторизации, как /health: закрывается на уровне прокси
+    return {
+        "backends": guards_stats(),
+        "feature_cache": cache_stats(),
+        "single_flight": {"in_flight": in_flight()},
+        "access_log": access_log.stats(),
+        "tracing": tracing.stats(),
+    }
+
+@router.get("/ready")
+def readiness_check(request: Request, response: Response):
+    # Readiness: старт завершен, БД доступна и схема на последней миграции — можно направлять трафик
+    if not getattr(request.app.state, "ready", False) or not schema_is_current():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "not ready"}
+    return {"status": "ready"}
+
+app = create_app()
@@ -0,0 +1,170 @@
+import asyncio
+import weakref
+
+import httpx
+
+from app.database.config import WRITE_MARKER_HEADER, SessionLocal
+from app.models.account import Account
+from app.models.user import User
+from app.services.crud.user import authenticate_user
+from app.services.deadline import DEADLINE_HEADER_SLACK, REQUEST_TIMEOUT_HEADER, DeadlineExceeded, deadline_scope
+from app.services.prediction import summarize_for_user
+from app.services.summarizer import load_models
+
+# Бэкенды бота: сессия пользователя — обычный dict, он хранится в user_data (PicklePersistence).
+# Ошибки, которые можно показать пользователю (баланс, неверный пароль), — ValueError.
+
+class InProcessBackend:
+    # Вызовы ядра внутри процесса бота: без HTTP, блокирующая работа уходит в поток
+    name = "inprocess"
+
+    def __init__(self):
+        load_models()
+
+    async def close(self):
+        pass
+
+    async def login(self, username: str, password: str) -> dict:
+        return await asyncio.to_thread(self._login, username, password)
+
+    def _login(self, username, password):
+        db = SessionLocal()
+        try:
+            user = authenticate_user(db, username, password)
+            if not user or not user.is_active:
+                raise ValueError("Incorrect username or password")
+            return {"user_id": user.id, "username": user.username}
+        finally:
+            db.close()
+
+    async def logout(self, session: dict):
+        # Токенов нет: достаточно удалить сессию в боте
+        pass
+
+    async def balance(self, session: dict) -> dict:
+        return await asyncio.to_thread(self._balance, session["user_id"])
+
+    def _balance(self, user_id):
+        db = SessionLocal()
+        try:
+            account = db.query(Account).filter(Account.user_id == user_id).first()
+            if not account:
+                raise ValueError("Account not found")
+            return {"balance": account.balance, "credit_limit": account.credit_limit}
+        finally:
+            db.close()
+
+    async def summarize_batch(self, jobs) -> list:
+        # Вся пачка — один поток и одна сессия БД; оплата и commit по-прежнему на каждое сообщение.
+        # Сообщение, чей срок истек в очереди, не обрабатывается и не оплачивается
+        return await asyncio.to_thread(self._summarize_batch, jobs)
+
+    def _summarize_batch(self, jobs):
+        db = SessionLocal()
+        results = []
+        try:
+            for job in jobs:
+                try:
+                    user = db.get(User, job.session["user_id"])
+                    if user is None or not user.is_active:
+                        raise ValueError("Inactive user, use /login again")
+                    with deadline_scope(job.deadline):
+                        results.append(summarize_for_user(db, user.id, job.text, job.model_type).summary)
+                except Exception as e:
+                    db.rollback()
+                    results.append(e)
+        finally:
+            db.close()
+        return results
+
+
+class HttpBackend:
+    # Вызовы API по HTTP через один клиент с пулом keep-alive соединений
+    name = "http"
+
+    def __init__(self, base_url: str, pool_size: int = 8, timeout: float = 60.0):
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout)
+        # Замок живет, пока его держит или ждет хотя бы один запрос
+        self._refresh_locks = weakref.WeakValueDictionary()
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def login(self, username: str, password: str) -> dict:
+        response = await self.client.post("/auth/login", data={"username": username, "password": password})
+        if response.status_code == 401:
+            raise ValueError("Incorrect username or password")
+        response.raise_for_status()
+        tokens = response.json()
+        return {"username": username, "access_token": tokens["access_token"], "refresh_token": tokens["refresh_token"]}
+
+    async def logout(self, session: dict):
+        # Отзываем токены в API (refresh-цепочку и текущий access), затем забываем замок сессии
+        try:
+            await self._request(session, "POST", "/auth/logout", json={"refresh_token": session["refresh_token"]})
+        finally:
+            self._refresh_locks.pop(session["username"], None)
+
+    def _refresh_lock(self, session: dict) -> asyncio.Lock:
+        # Замок на сессию пользователя (в самом dict его не хранить: сессия сериализуется в pickle)
+        lock = self._refresh_locks.get(session["username"])
+        if lock is None:
+            lock = self._refresh_locks[session["username"]] = asyncio.Lock()
+        return lock
+
+    async def _refresh(self, session: dict, stale_token: str):
+        # Параллельные запросы пачки получают 401 одновременно, а refresh-токен одноразовый:
+        # ротирует первый, остальные после замка видят новый токен и просто повторяют запрос
+        async with self._refresh_lock(session):
+            if session["access_token"] != stale_token:
+                return
+            refreshed = await self.client.post("/auth/refresh", json={"refresh_token": session["refresh_token"]})
+            if refreshed.status_code != 200:
+                raise ValueError("Session expired, use /login again")
+            tokens = refreshed.json()
+            session["access_token"] = tokens["access_token"]
+            session["refresh_token"] = tokens["refresh_token"]
+
+    async def _request(self, session: dict, method: str, path: str, headers: dict = None, **kwargs):
+        headers = dict(headers or {})
+        token = session["access_token"]
+        headers["Authorization"] = f"Bearer {token}"
+        # Отметка о последней записи: после списания баланс читается из основной БД в любом воркере
+        if session.get("last_write"):
+            headers[WRITE_MARKER_HEADER] = session["last_write"]
+        response = await self.client.request(method, path, headers=headers, **kwargs)
+        if response.status_code == 401 and session.get("refresh_token"):
+            # Access-токен истек: обновляем пару токенов и повторяем запрос один раз
+            await self._refresh(session, token)
+            headers["Authorization"] = f"Bearer {session['access_token']}"
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        if WRITE_MARKER_HEADER in response.headers:
+            session["last_write"] = response.headers[WRITE_MARKER_HEADER]
+        if response.status_code == 504:
+            raise DeadlineExceeded(response.json().get("detail", response.text))
+        if response.status_code in (400, 401, 403, 404):
+            raise ValueError(response.json().get("detail", response.text))
+        response.raise_for_status()
+        return response.json()
+
+    async def balance(self, session: dict) -> dict:
+        return await self._request(session, "GET", "/accounts/balance")
+
+    async def _summarize(self, job):
+        # Остаток срока сообщения передается API, оно прерывает работу само
+        job.deadline.check()
+        remaining = job.deadline.remaining()
+        try:
+            data = await self._request(
+                job.session, "POST", "/predictions/summarize",
+                params={"include_input": "false"}, json={"text": job.text, "model_type": job.model_type},
+                headers={REQUEST_TIMEOUT_HEADER: f"{remaining:.3f}"}, timeout=remaining + DEADLINE_HEADER_SLACK,
+            )
+        except httpx.TimeoutException:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return data["summary"]
+
+    async def summarize_batch(self, jobs) -> list:
+        # Запросы пачки идут параллельно, но не больше pool_size соединений одновременно
+        return await asyncio.gather(*(self._summarize(job) for job in jobs), return_exceptions=True)
@@ -0,0 +1,137 @@
+# Локальный фейк Telegram Bot API для проверки бота без сети
+# uvicorn app.bot.fake_telegram:app --port 8081
+# Бот: TELEGRAM_API_URL=http://localhost:8081/bot TELEGRAM_FILE_URL=http://localhost:8081/file/bot
+# Тест: POST /_test/messages — «написать» боту, GET /_test/sent — что бот отправил (см. test_bot.py)
+import asyncio
+import itertools
+import json
+import time
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+app = FastAPI(title="Fake Telegram Bot API")
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Sci-Summ", "username": "sci_summ_bot"}
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+_updates = []
+_updates_changed = asyncio.Condition()
+_sent = []
+_deleted = []
+_files = {}
+
+
+class IncomingMessage(BaseModel):
+    chat_id: int = 1000
+    text: Optional[str] = None
+    # Документ: содержимое файла текстом
+    file_name: Optional[str] = None
+    file_content: Optional[str] = None
+    mime_type: Optional[str] = "text/plain"
+
+
+def _chat(chat_id):
+    return {"id": chat_id, "type": "private", "first_name": "Test"}
+
+
+def _params(raw: dict) -> dict:
+    # PTB передает сложные значения JSON-строками внутри формы
+    params = {}
+    for key, value in raw.items():
+        try:
+            params[key] = json.loads(value)
+        except (TypeError, ValueError):
+            params[key] = value
+    return params
+
+
+def _ok(result):
+    return {"ok": True, "result": result}
+
+
+@app.post("/_test/messages")
+async def push_message(incoming: IncomingMessage):
+    message = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": _chat(incoming.chat_id),
+        "from": {"id": incoming.chat_id, "is_bot": False, "first_name": "Test"},
+    }
+    if incoming.file_content is not None:
+        file_id = f"file{len(_files) + 1}"
+        data = incoming.file_content.encode("utf-8")
+        _files[file_id] = data
+        message["document"] = {
+            "file_id": file_id, "file_unique_id": file_id, "file_name": incoming.file_name or "article.txt",
+            "mime_type": incoming.mime_type, "file_size": len(data),
+        }
+    else:
+        message["text"] = incoming.text
+        if incoming.text.startswith("/"):
+            command = incoming.text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    async with _updates_changed:
+        _updates.append({"update_id": next(_update_ids), "message": message})
+        _updates_changed.notify_all()
+    return {"message_id": message["message_id"]}
+
+
+@app.get("/_test/sent")
+def sent_messages(chat_id: Optional[int] = None):
+    return [m for m in _sent if chat_id is None or m["chat"]["id"] == chat_id]
+
+
+@app.get("/_test/deleted")
+def deleted_messages():
+    return _deleted
+
+
+@app.get("/file/bot{token}/{file_id}")
+def download_file(token: str, file_id: str):
+    return Response(_files.get(file_id, b""), media_type="application/octet-stream")
+
+
+@app.post("/bot{token}/{method}")
+async def bot_method(token: str, method: str, request: Request):
+    params = _params(dict(await request.form()))
+    if method == "getMe":
+        return _ok(BOT_USER)
+    if method == "getUpdates":
+        offset = int(params.get("offset") or 0)
+        timeout = min(float(params.get("timeout") or 0), 1.0)
+        async with _updates_changed:
+            if not any(u["update_id"] >= offset for u in _updates):
+                try:
+                    await asyncio.wait_for(_updates_changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            # Подтвержденные (id < offset) больше не отдаются
+            _updates[:] = [u for u in _updates if u["update_id"] >= offset]
+            return _ok(list(_updates))
+    if method == "sendMessage":
+        message = {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": _chat(int(params["chat_id"])),
+            "from": BOT_USER,
+            "text": params["text"],
+        }
+        if "reply_to_message_id" in params:
+            message["reply_to_message_id"] = params["reply_to_message_id"]
+        _sent.append(message)
+        return _ok(message)
+    if method == "deleteMessage":
+        _deleted.append(int(params["message_id"]))
+        return _ok(True)
+    if method == "getFile":
+        file_id = params["file_id"]
+        return _ok({
+            "file_id": file_id, "file_unique_id": file_id,
+            "file_size": len(_files.get(file_id, b"")), "file_path": file_id,
+        })
+    # deleteWebhook, sendChatAction и прочее, что боту достаточно подтвердить
+    return _ok(True)
@@ -0,0 +1,278 @@
+# Telegram-бот Sci-Summ
+# python -m app.bot.telegram_bot
+# Для локальной проверки без Telegram: uvicorn app.bot.fake_telegram:app --port 8081 и
+# TELEGRAM_API_URL=http://localhost:8081/bot TELEGRAM_FILE_URL=http://localhost:8081/file/bot
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+
+from telegram import Message, Update
+from telegram.constants import ChatAction
+from telegram.ext import (
+    Application,
+    CommandHandler,
+    ContextTypes,
+    MessageHandler,
+    PersistenceInput,
+    PicklePersistence,
+    filters,
+)
+
+from app.bot.backends import HttpBackend, InProcessBackend
+from app.services.deadline import Deadline, RequestAborted, request_timeout
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+# Адреса Bot API задаются явно, чтобы бота можно было запускать против локального фейка
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+TELEGRAM_FILE_URL = os.getenv("TELEGRAM_FILE_URL", "https://api.telegram.org/file/bot")
+# inprocess — ядро вызывается в процессе бота; http — через API (BOT_API_URL)
+BOT_BACKEND = os.getenv("BOT_BACKEND", "inprocess")
+BOT_API_URL = os.getenv("BOT_API_URL", "http://localhost:8080")
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "4"))
+BOT_BATCH_SIZE = int(os.getenv("BOT_BATCH_SIZE", "8"))
+BOT_QUEUE_SIZE = int(os.getenv("BOT_QUEUE_SIZE", "200"))
+BOT_MAX_FILE_SIZE = int(os.getenv("BOT_MAX_FILE_SIZE", str(1024 * 1024)))
+BOT_MODEL = os.getenv("BOT_MODEL", "default")
+BOT_PERSISTENCE_PATH = os.getenv("BOT_PERSISTENCE_PATH", "./data/bot.pickle")
+# Сколько сообщение может ждать в очереди и обрабатываться (по умолчанию — срок модели)
+BOT_REQUEST_TIMEOUT = os.getenv("BOT_REQUEST_TIMEOUT")
+
+MAX_MESSAGE_LENGTH = 4096
+TEXT_FILE_EXTENSIONS = (".txt", ".md", ".tex")
+
+HELP_TEXT = (
+    "Sci-Summ: пришлите текст статьи сообщением или файлом (.txt, .md, .tex).\n"
+    "/login <username> <password> — войти в аккаунт Sci-Summ\n"
+    "/balance — баланс\n"
+    "/logout — выйти"
+)
+
+
+@dataclass
+class SummarizeJob:
+    session: dict
+    text: str
+    model_type: str
+    message: Message
+    deadline: Deadline
+
+
+class SummarizationQueue:
+    # Сообщения копятся в ограниченной очереди и разбираются BOT_WORKERS воркерами пачками
+    # до BOT_BATCH_SIZE: всплеск сообщений в чате не создает по соединению/потоку на каждое
+    def __init__(self, backend, workers: int, batch_size: int, maxsize: int):
+        self.backend = backend
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: SummarizeJob) -> bool:
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                results = await self.backend.summarize_batch(batch)
+            except Exception as e:
+                logger.exception("Batch of %d failed", len(batch))
+                results = [e] * len(batch)
+            for job, result in zip(batch, results):
+                await self._reply(job, result)
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _reply(self, job: SummarizeJob, result):
+        if isinstance(result, ValueError):
+            text = f"Не удалось: {result}"
+        elif isinstance(result, RequestAborted):
+            text = "Не успели обработать вовремя, попробуйте позже"
+        elif isinstance(result, BaseException):
+            logger.error("Summarization failed: %r", result)
+            text = "Сервис временно недоступен, попробуйте позже"
+        else:
+            text = result
+        try:
+            await job.message.reply_text(text[:MAX_MESSAGE_LENGTH])
+        except Exception:
+            logger.exception("Failed to send reply")
+
+
+def get_queue(context: ContextTypes.DEFAULT_TYPE) -> SummarizationQueue:
+    return context.application.bot_data["queue"]
+
+
+def get_backend(context: ContextTypes.DEFAULT_TYPE):
+    return context.application.bot_data["backend"]
+
+
+def get_session(context: ContextTypes.DEFAULT_TYPE):
+    # Сессия, сохраненная другим бэкендом (после смены BOT_BACKEND), недействительна
+    session = context.user_data.get("session")
+    if session is None or session.get("backend") != get_backend(context).name:
+        return None
+    return session
+
+
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(HELP_TEXT)
+
+
+async def login_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Сообщение с паролем удаляем из чата сразу
+    try:
+        await update.message.delete()
+    except Exception:
+        pass
+    if len(context.args) != 2:
+        await update.effective_chat.send_message("Использование: /login <username> <password>")
+        return
+    try:
+        session = await get_backend(context).login(context.args[0], context.args[1])
+    except ValueError as e:
+        await update.effective_chat.send_message(f"Не удалось войти: {e}")
+        return
+    session["backend"] = get_backend(context).name
+    context.user_data["session"] = session
+    await update.effective_chat.send_message(f"Вы вошли как {session['username']}")
+
+
+async def logout_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    session = get_session(context)
+    if session is not None:
+        try:
+            await get_backend(context).logout(session)
+        except Exception:
+            # Сессия в боте удаляется в любом случае, токены истекут сами
+            logger.exception("Logout request failed")
+    context.user_data.pop("session", None)
+    await update.message.reply_text("Вы вышли")
+
+
+async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    session = get_session(context)
+    if session is None:
+        await update.message.reply_text("Сначала войдите: /login <username> <password>")
+        return
+    try:
+        data = await get_backend(context).balance(session)
+    except ValueError as e:
+        await update.message.reply_text(f"Не удалось: {e}")
+        return
+    await update.message.reply_text(f"Баланс: {data['balance']}, кредитный лимит: {data['credit_limit']}")
+
+
+async def enqueue(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+    session = get_session(context)
+    if session is None:
+        await update.message.reply_text("Сначала войдите: /login <username> <password>")
+        return
+    if not text.strip():
+        await update.message.reply_text("Пустой текст")
+        return
+    job = SummarizeJob(
+        session=session, text=text, model_type=BOT_MODEL, message=update.message,
+        deadline=Deadline(request_timeout(BOT_REQUEST_TIMEOUT, BOT_MODEL)),
+    )
+    if not get_queue(context).submit(job):
+        await update.message.reply_text("Слишком много запросов, попробуйте через минуту")
+        return
+    await update.effective_chat.send_action(ChatAction.TYPING)
+
+
+async def text_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await enqueue(update, context, update.message.text)
+
+
+async def document_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    document = update.message.document
+    name = (document.file_name or "").lower()
+    if not (name.endswith(TEXT_FILE_EXTENSIONS) or (document.mime_type or "").startswith("text/")):
+        await update.message.reply_text("Поддерживаются текстовые файлы: " + ", ".join(TEXT_FILE_EXTENSIONS))
+        return
+    if document.file_size and document.file_size > BOT_MAX_FILE_SIZE:
+        await update.message.reply_text(f"Файл больше {BOT_MAX_FILE_SIZE // 1024} КБ")
+        return
+    file = await document.get_file()
+    data = await file.download_as_bytearray()
+    await enqueue(update, context, data.decode("utf-8", errors="replace"))
+
+
+def create_backend():
+    if BOT_BACKEND == "http":
+        return HttpBackend(BOT_API_URL, pool_size=BOT_WORKERS * BOT_BATCH_SIZE)
+    return InProcessBackend()
+
+
+async def on_startup(application: Application):
+    backend = create_backend()
+    queue = SummarizationQueue(backend, BOT_WORKERS, BOT_BATCH_SIZE, BOT_QUEUE_SIZE)
+    queue.start()
+    application.bot_data["backend"] = backend
+    application.bot_data["queue"] = queue
+
+
+async def on_shutdown(application: Application):
+    await application.bot_data["queue"].stop()
+    await application.bot_data["backend"].close()
+
+
+def build_application(token: str = None) -> Application:
+    persistence_dir = os.path.dirname(BOT_PERSISTENCE_PATH)
+    if persistence_dir:
+        os.makedirs(persistence_dir, exist_ok=True)
+    application = (
+        Application.builder()
+        .token(token or TELEGRAM_BOT_TOKEN)
+        .base_url(TELEGRAM_API_URL)
+        .base_file_url(TELEGRAM_FILE_URL)
+        # Ответы воркеров идут параллельно: пула по умолчанию (1 соединение) не хватает
+        .connection_pool_size(BOT_WORKERS * 2)
+        # Между перезапусками хранятся только сессии пользователей; в bot_data — очередь и бэкенд
+        .persistence(PicklePersistence(
+            BOT_PERSISTENCE_PATH, store_data=PersistenceInput(bot_data=False, chat_data=False, callback_data=False)
+        ))
+        .concurrent_updates(True)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+    application.add_handler(CommandHandler(["start", "help"], start_command))
+    application.add_handler(CommandHandler("login", login_command))
+    application.add_handler(CommandHandler("logout", logout_command))
+    application.add_handler(CommandHandler("balance", balance_command))
+    application.add_handler(MessageHandler(filters.Document.ALL, document_message))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_message))
+    return application
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # httpx пишет INFO на каждый запрос к Bot API, включая long polling
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not TELEGRAM_BOT_TOKEN:
+        raise SystemExit("TELEGRAM_BOT_TOKEN is not set")
+    build_application().run_polling(allowed_updates=Update.ALL_TYPES)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,64 @@
+import hashlib
+import hmac
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
-DATABASE_URL = "sqlite:///./sci_summ.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sci_summ.db")
+# Реплика для чтения. Если не задана, для SQLite открывается отдельный
+# read-only пул к тому же файлу (WAL позволяет читать параллельно с записью)
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+# Сколько секунд после записи чтения пользователя идут в основную БД (read-your-writes)
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
 
-engine = create_engine(DATABASE_URL)
+# Размер пула соединений на процесс (значения по умолчанию — как у SQLAlchemy)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _pool_kwargs(url: str) -> dict:
+    if ":memory:" in url:
+        return {}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+
+engine = create_engine(DATABASE_URL, **_pool_kwargs(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+if _is_sqlite(DATABASE_URL):
+    @event.listens_for(engine, "connect")
+    def _sqlite_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+def _create_read_engine():
+    if READ_DATABASE_URL:
+        return create_engine(READ_DATABASE_URL, **_pool_kwargs(READ_DATABASE_URL))
+    if _is_sqlite(DATABASE_URL) and ":memory:" not in DATABASE_URL:
+        read_engine = create_engine(DATABASE_URL, **_pool_kwargs(DATABASE_URL))
+
+        @event.listens_for(read_engine, "connect")
+        def _sqlite_query_only(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+
+        return read_engine
+    return engine
+
+read_engine = _create_read_engine()
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -16,8 +66,96 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# ========== READ-YOUR-WRITES ==========
+# Отметка о записи хранится в двух местах: в памяти воркера, принявшего запись, и у клиента.
+# Воркер отдает подписанную отметку (cookie last_write и заголовок X-Last-Write,
+# app.middleware.read_your_writes), клиент присылает ее обратно — и любой воркер gunicorn
+# направляет чтения этого пользователя в основную БД до конца окна.
+WRITE_MARKER_COOKIE = "last_write"
+WRITE_MARKER_HEADER = "x-last-write"
+WRITE_MARKER_KEY = os.getenv(
+    "WRITE_MARKER_KEY", os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+).encode()
+
+_recent_writes = {}
+_recent_writes_lock = threading.Lock()
+# Состояние текущего запроса: пришедшая отметка и запись, сделанная в запросе
+# (dict общий, поэтому запись из потока пула видна middleware)
+_request_writes = ContextVar("read_your_writes", default=None)
+
+def _sign_write_marker(payload: str) -> str:
+    return hmac.new(WRITE_MARKER_KEY, payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+def make_write_marker(user_id: int, until: float) -> str:
+    payload = f"{user_id}.{int(until)}"
+    return f"{payload}.{_sign_write_marker(payload)}"
+
+def parse_write_marker(value: Optional[str]):
+    # (user_id, until) или None, если отметки нет или подпись не сходится
+    if not value:
+        return None
+    payload, _, signature = value.rpartition(".")
+    if not hmac.compare_digest(signature, _sign_write_marker(payload)):
+        return None
+    user_id, _, until = payload.partition(".")
+    try:
+        return int(user_id), int(until)
+    except ValueError:
+        return None
+
+def begin_request(marker: Optional[str]) -> tuple:
+    state = {"incoming": parse_write_marker(marker), "written": None}
+    return state, _request_writes.set(state)
+
+def end_request(token):
+    _request_writes.reset(token)
+
+def mark_write(user_id: int):
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[user_id] = now + READ_YOUR_WRITES_WINDOW
+        # Чистим истекшие записи, чтобы словарь не рос бесконечно
+        if len(_recent_writes) > 10000:
+            for key in [k for k, deadline in _recent_writes.items() if deadline < now]:
+                del _recent_writes[key]
+    state = _request_writes.get()
+    if state is not None:
+        state["written"] = (user_id, time.time() + READ_YOUR_WRITES_WINDOW)
+
+def recently_wrote(user_id: int) -> bool:
+    with _recent_writes_lock:
+        deadline = _recent_writes.get(user_id)
+    if deadline is not None and deadline > time.monotonic():
+        return True
+    state = _request_writes.get()
+    incoming = state["incoming"] if state is not None else None
+    return incoming is not None and incoming[0] == user_id and incoming[1] > time.time()
+
+def read_session_for_user(user_id: int, use_replica: bool = True) -> Session:
+    # Сразу после списания/пополнения читаем из основной БД, чтобы не увидеть устаревший баланс;
+    # use_replica=False (Settings.read_replica выключен) — всегда основная БД
+    if not use_replica or read_engine is engine or recently_wrote(user_id):
+        return SessionLocal()
+    return ReadSessionLocal()
+
+def get_read_db_for_user(user_id: int):
+    db = read_session_for_user(user_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    # Схема — только через миграции Alembic (включая FTS-индексы, которых нет в моделях)
+    from app.database.migrate import upgrade
+    upgrade()
 
 def get_database_engine():
     return engine
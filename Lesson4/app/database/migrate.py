@@ -0,0 +1,67 @@
+# Разовый шаг миграции схемы: запускается до старта воркеров, а не в lifespan
+# python -m app.database.migrate [revision]
+import os
+import re
+import sys
+
+from sqlalchemy import inspect, text
+
+from app.database.config import DATABASE_URL, engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Ревизия, соответствующая схеме, которую раньше создавал create_all в lifespan
+LEGACY_REVISION = "0001"
+
+def get_alembic_config():
+    from alembic.config import Config
+    cfg = Config(os.path.join(ROOT, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    cfg.set_main_option("sqlalchemy.url", DATABASE_URL)
+    return cfg
+
+def upgrade(revision: str = "head"):
+    from alembic import command
+    cfg = get_alembic_config()
+    # Базы, созданные через create_all до появления миграций, помечаем исходной ревизией
+    tables = inspect(engine).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(cfg, LEGACY_REVISION)
+    command.upgrade(cfg, revision)
+
+VERSIONS_DIR = os.path.join(ROOT, "migrations", "versions")
+_REVISION_RE = re.compile(r'^(revision|down_revision)\b[^=]*=\s*["\']([^"\']+)["\']', re.MULTILINE)
+
+_head_revision = None
+
+def head_revision() -> str:
+    # Последняя ревизия из migrations/versions (читается один раз на процесс) — та, на которую
+    # не ссылается ни одна down_revision. Файлы разбираются напрямую: импорт alembic.script
+    # (~170 мс) задерживал бы первый ответ /ready. Цепочка ревизий линейная
+    global _head_revision
+    if _head_revision is None:
+        revisions, parents = set(), set()
+        for name in os.listdir(VERSIONS_DIR):
+            if name.endswith(".py"):
+                with open(os.path.join(VERSIONS_DIR, name), encoding="utf-8") as f:
+                    for key, value in _REVISION_RE.findall(f.read()):
+                        (revisions if key == "revision" else parents).add(value)
+        heads = revisions - parents
+        if len(heads) != 1:
+            raise RuntimeError(f"Expected a single migration head, found: {sorted(heads)}")
+        _head_revision = heads.pop()
+    return _head_revision
+
+def schema_is_current() -> bool:
+    # Для readiness: БД доступна и миграции применены до последней ревизии
+    try:
+        with engine.connect() as conn:
+            current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except Exception:
+        return False
+    return current == head_revision()
+
+if __name__ == "__main__":
+    print(f"Migrating database schema: {DATABASE_URL}")
+    upgrade(sys.argv[1] if len(sys.argv) > 1 else "head")
+    print("Done")
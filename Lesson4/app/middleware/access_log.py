@@ -0,0 +1,44 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services import access_log
+
+
+class AccessLogMiddleware:
+    # Строка access-лога на каждый HTTP-запрос (app.services.access_log). Стоит снаружи
+    # остальных middleware, чтобы latency включала сжатие ответа.
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not access_log.running():
+            await self.app(scope, receive, send)
+            return
+
+        fields, token = access_log.begin_request()
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            fields["error"] = type(e).__name__
+            raise
+        finally:
+            access_log.end_request(token)
+            path = scope["path"]
+            if scope.get("query_string"):
+                path = f"{path}?{scope['query_string'].decode('latin-1')}"
+            route = scope.get("route")
+            access_log.log_request(
+                scope["method"], path, route.path if route is not None else None,
+                status, time.perf_counter() - start, fields,
+            )
@@ -0,0 +1,164 @@
+import importlib.util
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Brotli опционален, без него только gzip; модуль загружается при первом сжатом ответе
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Порог и уровни подобраны бенчмарком benchmarks/compression.py:
+# мелкие ответы (баланс, health) не сжимаются; gzip 4 и brotli 4 дают ~78-80% экономии
+# на истории, а уровни 6-9 добавляют пару процентов ценой в 3-8 раз большего CPU.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "4"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Уже сжатые форматы повторно не сжимаем
+SKIP_CONTENT_TYPES = ("application/gzip", "application/zstd", "application/octet-stream",
+                      "application/vnd.apache.parquet", "image/", "video/", "audio/")
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality):
+        import brotli
+
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+def choose_encoding(accept_encoding: str, brotli_enabled: bool = True):
+    accepted = {item.split(";")[0].strip().lower() for item in accept_encoding.split(",")}
+    if brotli_enabled and BROTLI_AVAILABLE and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    # GZip/Brotli с порогом по размеру. В отличие от starlette GZipMiddleware
+    # поддерживает Brotli и не трогает уже сжатые типы (экспорт, parquet).
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY,
+                 brotli_enabled: bool = True) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""), self.brotli_enabled)
+            if encoding is not None:
+                responder = _CompressionResponder(self.app, self, encoding)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def make_encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, middleware: CompressionMiddleware, encoding: str) -> None:
+        self.app = app
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.encoder = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _start_encoding(self, streaming: bool):
+        self.encoder = self.middleware.make_encoder(self.encoding)
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoder.name
+        # ETag не переписываем: иначе он разойдется с ETag ответа 304, который не сжимается
+        if "accept-encoding" not in headers.get("vary", "").lower():
+            headers.add_vary_header("Accept-Encoding")
+        if streaming:
+            del headers["Content-Length"]
+        return headers
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Заголовки отправим, когда станет ясно, сжимаем ли тело
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or content_type.startswith(SKIP_CONTENT_TYPES)
+            )
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if not self.started:
+            self.started = True
+            if len(body) < self.middleware.minimum_size and not more_body:
+                # Маленький ответ: сжатие дороже экономии
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            if not more_body:
+                headers = self._start_encoding(streaming=False)
+                body = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                message["body"] = body
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            self._start_encoding(streaming=True)
+            await self.send(self.initial_message)
+
+        data = self.encoder.compress(body)
+        if not more_body:
+            data += self.encoder.finish()
+        message["body"] = data
+        await self.send(message)
@@ -0,0 +1,50 @@
+import math
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database.config import (
+    READ_YOUR_WRITES_WINDOW,
+    WRITE_MARKER_COOKIE,
+    WRITE_MARKER_HEADER,
+    begin_request,
+    end_request,
+    make_write_marker,
+)
+
+
+class ReadYourWritesMiddleware:
+    # Переносит отметку о записи между воркерами через клиента (app.database.config):
+    # читает ее из заголовка X-Last-Write или cookie, после записи в запросе отдает новую
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        marker = headers.get(WRITE_MARKER_HEADER)
+        if marker is None and "cookie" in headers:
+            marker = cookie_parser(headers["cookie"]).get(WRITE_MARKER_COOKIE)
+        state, token = begin_request(marker)
+
+        async def send_with_marker(message: Message) -> None:
+            if message["type"] == "http.response.start" and state["written"] is not None:
+                value = make_write_marker(*state["written"])
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append(WRITE_MARKER_HEADER, value)
+                response_headers.append(
+                    "set-cookie",
+                    f"{WRITE_MARKER_COOKIE}={value}; Max-Age={math.ceil(READ_YOUR_WRITES_WINDOW)}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            end_request(token)
@@ -0,0 +1,45 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services import access_log, tracing
+
+
+class TracingMiddleware:
+    # Серверный спан на HTTP-запрос (app.services.tracing); вложенные стадии — его потомки.
+    # Стоит внутри access-лога: trace_id попадает в строку запроса
+
+    def __init__(self, app: ASGIApp, sample_rate: float = tracing.TRACING_SAMPLE_RATE) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root = tracing.start_trace(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get(tracing.TRACEPARENT_HEADER),
+            self.sample_rate,
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        access_log.annotate(trace_id=root.trace_id)
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.response.status_code", message["status"])
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_with_status)
+            route = scope.get("route")
+            if route is not None:
+                # Имя спана по шаблону маршрута, как у инструментирования FastAPI в OpenTelemetry
+                root.name = f"{scope['method']} {route.path}"
+                root.set_attribute("http.route", route.path)
+            if root.attributes.get("http.response.status_code", 500) >= 500:
+                root.error = "HTTP server error"
@@ -10,6 +10,8 @@ class Account(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     balance = Column(Float, default=0.0)
     credit_limit = Column(Float, default=100.0)
+    # Зарезервировано незавершенными операциями (account_holds); доступно: balance + credit_limit - held
+    held = Column(Float, nullable=False, default=0.0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="account")
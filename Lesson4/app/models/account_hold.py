@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database.config import Base
+
+class AccountHold(Base):
+    # Резерв средств под работу, которая еще не выполнена: сумма учтена в accounts.held,
+    # после выполнения списывается (captured) или возвращается (released)
+    __tablename__ = "account_holds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    captured_amount = Column(Float, nullable=True)
+    status = Column(String(10), nullable=False, default="held")  # held | captured | released
+    description = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    settled_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_account_holds_status_created_at", "status", "created_at"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Boolean, BigInteger
+from sqlalchemy.sql import func
+from app.database.config import Base
+
+class ExportJob(Base):
+    # Фоновая выгрузка истории пользователя в файл (JSONL.gz или Parquet)
+    __tablename__ = "export_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, им же называется файл
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    dataset = Column(String(20), nullable=False)  # predictions | transactions
+    format = Column(String(10), nullable=False)  # jsonl | parquet
+    include_input = Column(Boolean, nullable=False, default=False)
+    status = Column(String(10), nullable=False, default="pending")  # pending | running | done | failed | expired
+    rows = Column(Integer, nullable=False, default=0)
+    size = Column(BigInteger, nullable=True)  # размер готового файла в байтах
+    error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    # Последняя отметка прогресса: задание pending/running без отметок дольше таймаута брошено
+    updated_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_export_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_export_jobs_status_updated_at", "status", "updated_at"),
+    )
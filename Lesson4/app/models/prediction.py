@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database.config import Base
+
+class Prediction(Base):
+    __tablename__ = "predictions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # sha256 входного текста: ключ кэша/поиска одинаковых входов и ссылка на
+    # сжатый текст в prediction_inputs (сам текст в строке предсказания не хранится)
+    input_hash = Column(String(64), nullable=False)
+    input_preview = Column(String(200), nullable=True)
+    summary = Column(Text, nullable=False)
+    # sha256 результата: основа сильного ETag для GET /predictions/{id}
+    result_hash = Column(String(64), nullable=True)
+    model_used = Column(String(50), nullable=False, default="default")
+    cost = Column(Float, nullable=False, default=0.0)
+    processing_time = Column(Float, nullable=False, default=0.0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    user = relationship("User")
+
+    # Индексы создаются миграцией 0003 (CONCURRENTLY на PostgreSQL)
+    __table_args__ = (
+        Index("ix_predictions_user_id_created_at", "user_id", "created_at"),
+        Index("ix_predictions_input_hash_model_used", "input_hash", "model_used"),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.database.config import Base
+
+class PredictionInput(Base):
+    # Входные тексты хранятся сжатыми и один раз на содержимое (дедупликация между пользователями)
+    __tablename__ = "prediction_inputs"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 исходного текста
+    codec = Column(String(10), nullable=False)  # zstd | zlib
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # длина исходного текста в символах
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Index
+from app.database.config import Base
+
+class TokenRevocation(Base):
+    # Журнал отзыва access-токенов, общий для всех воркеров: либо один токен (jti), либо все
+    # токены пользователя, выданные не позже revoked_at. Воркеры догружают записи
+    # по revoked_at с перекрытием окон (см. app/services/revocation.py)
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), nullable=True)
+    user_id = Column(Integer, nullable=True)
+    revoked_at = Column(Integer, nullable=False)  # unix time
+    # После этого момента отозванные токены истекли сами, запись можно удалить
+    expires_at = Column(Integer, nullable=False)  # unix time
+
+    __table_args__ = (
+        Index("ix_token_revocations_expires_at", "expires_at"),
+        Index("ix_token_revocations_revoked_at", "revoked_at"),
+    )
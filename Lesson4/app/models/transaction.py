@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database.config import Base
+
+class Transaction(Base):
+    # Журнал операций по счету (ledger): пополнения со знаком +, списания со знаком -
+    __tablename__ = "transactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    type = Column(String(20), nullable=False)
+    description = Column(String(255))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    account = relationship("Account")
+
+    __table_args__ = (
+        Index("ix_transactions_account_id_created_at", "account_id", "created_at"),
+    )
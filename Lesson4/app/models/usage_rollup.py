@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, BigInteger, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database.config import Base
+
+class UsageRollup(Base):
+    # Предагрегированное использование по (период, начало интервала, пользователь, модель).
+    # Пополняется инкрементально фоновой задачей, админские отчеты читают только эту таблицу
+    __tablename__ = "usage_rollups"
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(5), nullable=False)  # hour | day
+    bucket_start = Column(DateTime, nullable=False)  # начало интервала, UTC
+    user_id = Column(Integer, nullable=False)
+    model_used = Column(String(50), nullable=False)
+    calls = Column(Integer, nullable=False, default=0)
+    chars = Column(BigInteger, nullable=False, default=0)  # длина входных текстов в символах
+    revenue = Column(Float, nullable=False, default=0.0)
+    processing_time = Column(Float, nullable=False, default=0.0)  # сумма, среднее = / calls
+
+    __table_args__ = (
+        UniqueConstraint("period", "bucket_start", "user_id", "model_used", name="uq_usage_rollups_bucket"),
+        Index("ix_usage_rollups_period_user_id_bucket_start", "period", "user_id", "bucket_start"),
+    )
+
+class LedgerRollup(Base):
+    # Предагрегированный журнал операций по (период, начало интервала, пользователь, тип операции)
+    __tablename__ = "ledger_rollups"
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(5), nullable=False)  # hour | day
+    bucket_start = Column(DateTime, nullable=False)  # начало интервала, UTC
+    user_id = Column(Integer, nullable=False)
+    type = Column(String(20), nullable=False)  # deposit | withdrawal
+    entries = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False, default=0.0)  # со знаком, как в журнале
+
+    __table_args__ = (
+        UniqueConstraint("period", "bucket_start", "user_id", "type", name="uq_ledger_rollups_bucket"),
+        Index("ix_ledger_rollups_period_user_id_bucket_start", "period", "user_id", "bucket_start"),
+    )
+
+class RollupState(Base):
+    # Докуда (id предсказания или операции, по имени rollup) данные уже учтены
+    __tablename__ = "rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,110 @@
+import os
+import random
+import time
+from contextvars import ContextVar
+
+from app.services.batch_writer import BatchFileHandler, BatchWriter
+
+# Структурированный JSON-лог запросов и аудита. В обработчике запроса запись — только dict
+# в ограниченной очереди, без LogRecord и форматирования (~2 мкс против ~10 мкс через
+# logging.Logger); сериализация и запись в файл идут в фоновом потоке пачками, с ротацией
+# (app.services.batch_writer).
+# Успешные запросы можно сэмплировать, ошибки пишутся всегда.
+# Строки запросов содержат ts/method/path — лог можно подать в benchmarks/replay.py
+# (тела запросов не пишутся, POST воспроизводятся без тела).
+ACCESS_LOG = os.getenv("ACCESS_LOG", "on") == "on"
+# {pid} в пути — отдельный файл на процесс (несколько воркеров gunicorn не делят ротацию)
+ACCESS_LOG_PATH = os.getenv("ACCESS_LOG_PATH", "./data/logs/access.log")
+# Доля успешных запросов, попадающих в лог (ошибки и аудит — всегда)
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+ACCESS_LOG_MAX_BYTES = int(os.getenv("ACCESS_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+ACCESS_LOG_BACKUP_COUNT = int(os.getenv("ACCESS_LOG_BACKUP_COUNT", "5"))
+# При переполнении очереди записи отбрасываются
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+# Поля текущего запроса: middleware создает dict, эндпоинты и сервисы дописывают в него
+# (contextvars доходят и до потоков пула, dict общий)
+_request_fields = ContextVar("access_log_fields", default=None)
+
+_writer = None
+
+
+def start(path: str = None):
+    # Запускается в каждом воркере после fork (lifespan), поток не переживает fork
+    # Включение — Settings.access_log (по умолчанию ACCESS_LOG), решает create_app
+    global _writer
+    if _writer is not None:
+        return
+    path = (path or ACCESS_LOG_PATH).format(pid=os.getpid())
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _writer = BatchWriter(BatchFileHandler(
+        path, maxBytes=ACCESS_LOG_MAX_BYTES, backupCount=ACCESS_LOG_BACKUP_COUNT, encoding="utf-8"
+    ), ACCESS_LOG_QUEUE_SIZE, "access-log")
+    _writer.start()
+
+
+def stop(timeout: float = 5.0):
+    # Дописывает очередь и закрывает файл
+    global _writer
+    if _writer is None:
+        return
+    writer, _writer = _writer, None
+    writer.close(timeout)
+
+
+def running() -> bool:
+    return _writer is not None
+
+
+def stats() -> dict:
+    writer = _writer
+    if writer is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queued": writer.queue.qsize(),
+        "written": writer.written,
+        "dropped": writer.dropped,
+        "sample_rate": ACCESS_LOG_SAMPLE_RATE,
+    }
+
+
+def begin_request() -> tuple:
+    fields = {}
+    return fields, _request_fields.set(fields)
+
+
+def end_request(token):
+    _request_fields.reset(token)
+
+
+def annotate(**fields):
+    # Дополнительные поля строки текущего запроса (user_id, cost, summarizer_ms, cache_hit...)
+    current = _request_fields.get()
+    if current is not None:
+        current.update(fields)
+
+
+def log_request(method: str, path: str, route: str, status: int, latency: float, fields: dict):
+    writer = _writer
+    if writer is None:
+        return
+    failed = status >= 400 or "error" in fields
+    if not failed and ACCESS_LOG_SAMPLE_RATE < 1.0:
+        if random.random() >= ACCESS_LOG_SAMPLE_RATE:
+            return
+        # Вес записи при подсчетах по сэмплированному логу
+        fields["sample_rate"] = ACCESS_LOG_SAMPLE_RATE
+    writer.put({
+        "type": "access", "ts": time.time(), "method": method, "path": path, "route": route,
+        "status": status, "latency_ms": round(latency * 1000, 2), **fields,
+    })
+
+
+def audit(event: str, **fields):
+    # События безопасности и денег (вход, регистрация, пополнение, админские действия): без сэмплирования
+    writer = _writer
+    if writer is None:
+        return
+    current = _request_fields.get() or {}
+    writer.put({"type": "audit", "ts": time.time(), "event": event, "user_id": current.get("user_id"), **fields})
@@ -1,53 +1,161 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional
 
-from app.database.config import SessionLocal
-from app.models.user import User
+from app.services import revocation
+from app.services.access_log import annotate
+from app.services.tracing import span
 
 # Конфигурация JWT
-SECRET_KEY = "your-secret-key-change-in-production"
+# Кольцо ключей: JWT_KEYS="kid1:secret1,kid2:secret2", новые токены подписываются
+# ключом JWT_ACTIVE_KID, проверяются любым ключом из кольца (выбор по kid в заголовке).
+# Для ротации добавляем новый ключ, делаем его активным, старый убираем через
+# ACCESS_TOKEN_EXPIRE_MINUTES.
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+def _load_key_ring():
+    raw = os.getenv("JWT_KEYS")
+    if not raw:
+        return {"default": SECRET_KEY}
+    ring = {}
+    for item in raw.split(","):
+        kid, _, secret = item.strip().partition(":")
+        if kid and secret:
+            ring[kid] = secret
+    return ring
+
+KEY_RING = _load_key_ring()
+ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", next(iter(KEY_RING)))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+@dataclass(frozen=True)
+class CurrentUser:
+    # Пользователь, восстановленный из claims токена, без обращения к БД
+    id: int
+    username: str
+    is_admin: bool
+    is_active: bool
+    jti: str
+    issued_at: int
+    expires_at: int
+
+def token_claims(user) -> dict:
+    return {
+        "sub": user.username,
+        "uid": user.id,
+        "role": "admin" if user.is_admin else "user",
+        "act": bool(user.is_active),
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        expire = now + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "iat": now, "jti": uuid.uuid4().hex})
+    from jose import jwt  # ленивый импорт
+    encoded_jwt = jwt.encode(
+        to_encode, KEY_RING[ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": ACTIVE_KID}
+    )
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+# ========== КЭШ ПРОВЕРЕННЫХ ТОКЕНОВ ==========
+# LRU: токен -> CurrentUser. Повторные запросы с тем же токеном не проверяют
+# подпись заново и не ходят в БД.
+_verified_tokens = OrderedDict()
+_verified_lock = threading.Lock()
+
+def _cache_get(token: str) -> Optional[CurrentUser]:
+    with _verified_lock:
+        principal = _verified_tokens.get(token)
+        if principal is not None:
+            _verified_tokens.move_to_end(token)
+        return principal
+
+def _cache_put(token: str, principal: CurrentUser):
+    with _verified_lock:
+        _verified_tokens[token] = principal
+        _verified_tokens.move_to_end(token)
+        while len(_verified_tokens) > TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+
+def _cache_drop(token: str):
+    with _verified_lock:
+        _verified_tokens.pop(token, None)
+
+def decode_access_token(token: str) -> Optional[CurrentUser]:
+    # Проверка подписи ключом из кольца по kid; None если токен невалиден
+    from jose import JWTError, jwt
+    try:
+        kid = jwt.get_unverified_header(token).get("kid", "default")
+        key = KEY_RING.get(kid)
+        if key is None:
+            return None
+        payload = jwt.decode(token, key, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None or payload.get("uid") is None:
+        return None
+    return CurrentUser(
+        id=int(payload["uid"]),
+        username=payload["sub"],
+        is_admin=payload.get("role") == "admin",
+        is_active=bool(payload.get("act", True)),
+        jti=payload.get("jti", ""),
+        issued_at=int(payload.get("iat", 0)),
+        expires_at=int(payload["exp"]),
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    with span("auth.get_current_user") as current:
+        principal = _cache_get(token)
+        current.set_attribute("auth.token_cache_hit", principal is not None)
+        if principal is None:
+            with span("auth.jwt_decode"):
+                principal = decode_access_token(token)
+            if principal is None:
+                raise credentials_exception
+            _cache_put(token, principal)
+        elif principal.expires_at <= time.time():
+            _cache_drop(token)
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    db = SessionLocal()
-    user = db.query(User).filter(User.username == username).first()
-    db.close()
-    if user is None:
-        raise credentials_exception
-    return user
-
-def get_current_active_user(current_user: User = Depends(get_current_user)):
+
+        # Журнал отзывов (app.services.revocation) догружается из БД не чаще раза в несколько секунд
+        if revocation.needs_sync():
+            await run_in_threadpool(revocation.sync)
+        if revocation.is_revoked(principal.jti, principal.id, principal.issued_at):
+            _cache_drop(token)
+            raise credentials_exception
+        current.set_attribute("enduser.id", principal.id)
+    annotate(user_id=principal.id)
+    return principal
+
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_admin_user(current_user: CurrentUser = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return current_user
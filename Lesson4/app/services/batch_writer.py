@@ -0,0 +1,75 @@
+import queue
+import threading
+from logging.handlers import RotatingFileHandler
+
+import orjson
+
+# Запись в файл из фонового потока: обработчик запроса только кладет объект в ограниченную
+# очередь, сериализация, ротация и write идут пачками в отдельном потоке.
+# Используется access-логом (app.services.access_log) и экспортом спанов (app.services.tracing).
+BATCH_SIZE = 512
+_STOP = object()
+
+
+class BatchFileHandler(RotatingFileHandler):
+    # Ротация от RotatingFileHandler, но пачка записей уходит одним write
+    def format_batch(self, records) -> str:
+        # По строке JSON на запись
+        return b"".join(orjson.dumps(record) + b"\n" for record in records).decode("utf-8")
+
+    def write_batch(self, records):
+        data = self.format_batch(records)
+        with self.lock:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(data)
+            self.stream.flush()
+
+
+class BatchWriter(threading.Thread):
+    # Забирает из очереди все накопившееся (до BATCH_SIZE) и пишет одним write.
+    # При переполнении очереди (диск не успевает) записи отбрасываются, запросы не ждут
+    def __init__(self, handler: BatchFileHandler, queue_size: int, name: str):
+        super().__init__(name=name, daemon=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = handler
+        self.written = 0
+        self.dropped = 0
+
+    def put(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            batch = []
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= BATCH_SIZE:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.handler.write_batch(batch)
+                    self.written += len(batch)
+                except Exception:
+                    self.dropped += len(batch)
+            if item is _STOP:
+                return
+
+    def close(self, timeout: float = 5.0):
+        # Дописывает очередь и закрывает файл
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.join(timeout)
+        self.handler.close()
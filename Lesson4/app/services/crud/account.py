@@ -1,14 +1,117 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 from app.models.account import Account
+from app.models.account_hold import AccountHold
+from app.models.transaction import Transaction
+from app.services.tracing import span
+
+def available_funds_condition(amount: float):
+    # Баланс может уходить в минус до credit_limit; зарезервированное (held) недоступно
+    return Account.balance + func.coalesce(Account.credit_limit, 0) - Account.held >= amount
+
+def _insufficient_funds(db: Session, account_id: int):
+    if db.query(Account.id).filter(Account.id == account_id).first() is None:
+        return ValueError("Account not found")
+    return ValueError("Insufficient funds")
 
+# Операции со счетом — спаны billing.* (app.services.tracing), их запросы и коммит — вложенные db.*
 def withdraw_from_account(db: Session, account_id: int, amount: float, description: str = ""):
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise ValueError("Account not found")
+    # Проверка и списание одним условным UPDATE: параллельные запросы не уводят баланс за лимит
+    with span("billing.withdraw", **{"billing.amount": amount}):
+        result = db.execute(
+            update(Account)
+            .where(Account.id == account_id, available_funds_condition(amount))
+            .values(balance=Account.balance - amount)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise _insufficient_funds(db, account_id)
+        db.add(Transaction(account_id=account_id, amount=-amount, type="withdrawal", description=description))
+        db.commit()
+        return db.get(Account, account_id)
+
+def deposit_to_account(db: Session, account: Account, amount: float, description: str = ""):
+    # Прибавление в самом UPDATE: параллельное списание или пополнение не затирается
+    # значением баланса, прочитанным до записи
+    with span("billing.deposit", **{"billing.amount": amount}):
+        db.execute(
+            update(Account)
+            .where(Account.id == account.id)
+            .values(balance=Account.balance + amount)
+            .execution_options(synchronize_session=False)
+        )
+        db.add(Transaction(account_id=account.id, amount=amount, type="deposit", description=description))
+        db.commit()
+        db.refresh(account)
+        return account
+
+# ========== HOLDS ==========
+def place_hold(db: Session, account_id: int, amount: float, description: str = "") -> AccountHold:
+    # Атомарный резерв суммы с учетом credit_limit; фиксируется сразу, до работы модели
+    with span("billing.hold", **{"billing.amount": amount}):
+        result = db.execute(
+            update(Account)
+            .where(Account.id == account_id, available_funds_condition(amount))
+            .values(held=Account.held + amount)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise _insufficient_funds(db, account_id)
+        hold = AccountHold(account_id=account_id, amount=amount, status="held", description=description)
+        db.add(hold)
+        db.commit()
+        return hold
+
+def capture_hold(db: Session, hold_id: int, amount: float = None, description: str = "") -> AccountHold:
+    # Списывает amount (по умолчанию весь резерв), остаток резерва освобождается.
+    # Коммитит вместе со всем, что вызывающий успел добавить в сессию (например, результаты).
+    with span("billing.capture") as current:
+        hold = db.get(AccountHold, hold_id)
+        if hold is None:
+            raise ValueError("Hold not found")
+        amount = hold.amount if amount is None else min(amount, hold.amount)
+        status = "captured" if amount > 0 else "released"
+        current.set_attribute("billing.amount", amount)
+        current.set_attribute("billing.hold_status", status)
+        result = db.execute(
+            update(AccountHold)
+            .where(AccountHold.id == hold_id, AccountHold.status == "held")
+            .values(status=status, captured_amount=amount, settled_at=datetime.utcnow())
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise ValueError("Hold is already settled")
+        db.execute(
+            update(Account)
+            .where(Account.id == hold.account_id)
+            .values(held=Account.held - hold.amount, balance=Account.balance - amount)
+        )
+        if amount > 0:
+            db.add(Transaction(
+                account_id=hold.account_id, amount=-amount, type="withdrawal",
+                description=description or hold.description,
+            ))
+        db.commit()
+        db.refresh(hold)
+        return hold
 
-    if account.balance < amount:
-        raise ValueError("Insufficient funds")
+def release_hold(db: Session, hold_id: int) -> AccountHold:
+    return capture_hold(db, hold_id, 0.0)
 
-    account.balance -= amount
-    db.commit()
-    return account
+def release_stale_holds(db: Session, older_than: timedelta) -> int:
+    # Резервы, оставшиеся после падения процесса между резервом и списанием
+    cutoff = datetime.utcnow() - older_than
+    hold_ids = [
+        hold_id for (hold_id,) in db.query(AccountHold.id)
+        .filter(AccountHold.status == "held", AccountHold.created_at < cutoff)
+    ]
+    released = 0
+    for hold_id in hold_ids:
+        try:
+            release_hold(db, hold_id)
+            released += 1
+        except ValueError:
+            pass  # успели закрыть параллельно
+    return released
@@ -0,0 +1,83 @@
+import hashlib
+import hmac
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.services.auth import SECRET_KEY
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+REFRESH_TOKEN_PEPPER = os.getenv("REFRESH_TOKEN_PEPPER", SECRET_KEY).encode()
+
+def hash_refresh_token(token: str) -> str:
+    # HMAC вместо bcrypt: токен случайный (256 бит), перебор не страшен
+    return hmac.new(REFRESH_TOKEN_PEPPER, token.encode(), hashlib.sha256).hexdigest()
+
+def issue_refresh_token(db: Session, user_id: int, family_id: str = None) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+    return token
+
+def revoke_family(db: Session, family_id: str):
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    db.commit()
+
+def rotate_refresh_token(db: Session, token: str):
+    # Возвращает (user, новый refresh token) или None
+    stored = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(token)
+    ).first()
+    if stored is None:
+        return None
+
+    now = datetime.utcnow()
+    if stored.revoked_at is not None:
+        # Повторное использование уже ротированного токена: вероятна кража, отзываем цепочку
+        revoke_family(db, stored.family_id)
+        return None
+    if stored.expires_at <= now:
+        return None
+
+    # Атомарно помечаем токен использованным: из двух параллельных refresh пройдет один
+    result = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        revoke_family(db, stored.family_id)
+        return None
+
+    user = db.query(User).filter(User.id == stored.user_id).first()
+    if user is None or not user.is_active:
+        db.commit()
+        return None
+
+    new_token = issue_refresh_token(db, user.id, stored.family_id)
+    return user, new_token
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    stored = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(token)
+    ).first()
+    if stored is None:
+        return False
+    revoke_family(db, stored.family_id)
+    return True
@@ -1,15 +1,36 @@
+import hashlib
+import hmac
+import re
+
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.account import Account
-from passlib.context import CryptContext
+from app.services.revocation import revoke_user
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib/bcrypt импортируются при первом использовании, а не при старте приложения
+_pwd_context = None
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+# Хэши ранних версий API и main.py: SHA-256 со статической солью. Переводятся в bcrypt
+# при первом успешном входе пользователя
+LEGACY_SALT = "sci_summ_salt"
+_LEGACY_HASH = re.compile(r"[0-9a-f]{64}")
+
+def is_legacy_hash(hashed_password: str) -> bool:
+    return _LEGACY_HASH.fullmatch(hashed_password) is not None
+
+def verify_legacy_password(password: str, hashed_password: str) -> bool:
+    legacy = hashlib.sha256(f"{password}{LEGACY_SALT}".encode()).hexdigest()
+    return hmac.compare_digest(legacy, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_user(db: Session, user_data):
     # Проверяем существование пользователя
@@ -44,13 +65,34 @@ def create_user(db: Session, user_data):
 def get_all_users(db: Session):
     return db.query(User).all()
 
+def deactivate_user(db: Session, user_id: int):
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    user.is_active = False
+    # Выданные access-токены несут act=true: отзываем их во всех воркерах (коммит общий)
+    revoke_user(db, user.id)
+    return user
+
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
+def verify_password(password: str, hashed_password: str):
+    # (верен ли пароль, новый хэш или None): новый хэш — если сохраненный устарел
+    if is_legacy_hash(hashed_password):
+        if not verify_legacy_password(password, hashed_password):
+            return False, None
+        return True, get_password_hash(password)
+    return get_pwd_context().verify_and_update(password, hashed_password)
+
 def authenticate_user(db: Session, username: str, password: str):
     user = get_user_by_username(db, username)
     if not user:
         return False
-    if not pwd_context.verify(password, user.hashed_password):
+    valid, new_hash = verify_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        db.commit()
     return user
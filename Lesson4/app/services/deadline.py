@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Срок запроса: из заголовка X-Request-Timeout (секунды) или по умолчанию для модели.
+# Срок и отмена (клиент отключился) доходят до потоков суммаризации через contextvar,
+# работа проверяет их кооперативно: перед стартом и между абзацами.
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+MODEL_TIMEOUTS = {"large": float(os.getenv("REQUEST_TIMEOUT_LARGE", "60"))}
+# Запас клиентского таймаута поверх срока, переданного в заголовке: сервер должен успеть ответить 504
+DEADLINE_HEADER_SLACK = 1.0
+# Как часто проверять отключение клиента
+DISCONNECT_POLL_INTERVAL = 0.1
+
+
+class RequestAborted(Exception):
+    pass
+
+
+class DeadlineExceeded(RequestAborted):
+    pass
+
+
+class RequestCancelled(RequestAborted):
+    pass
+
+
+class Deadline:
+    def __init__(self, timeout: float):
+        self.expires_at = time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def aborted(self) -> bool:
+        return self.cancelled or time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.cancelled:
+            raise RequestCancelled("Request was cancelled by the client")
+        if time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def sleep(self, seconds: float):
+        # Ожидание, которое прерывается отменой или истечением срока
+        remaining = self.remaining()
+        if self._cancelled.wait(min(seconds, remaining)):
+            self.check()
+        if seconds > remaining:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline():
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def sleep_with_deadline(seconds: float):
+    deadline = _current_deadline.get()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+
+
+def current_deadline_aborted() -> bool:
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.aborted()
+
+
+def submit_with_context(pool, fn, *args):
+    # Задача в пуле потоков видит contextvars отправителя (срок запроса и т.п.)
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def request_timeout(header_value: Optional[str], model_type: str = "default") -> float:
+    # Заголовок может только сократить срок относительно умолчания модели
+    limit = MODEL_TIMEOUTS.get(model_type, REQUEST_TIMEOUT)
+    if header_value is None:
+        return limit
+    try:
+        timeout = float(header_value)
+    except ValueError:
+        raise ValueError(f"{REQUEST_TIMEOUT_HEADER} must be a number of seconds")
+    if timeout <= 0:
+        raise ValueError(f"{REQUEST_TIMEOUT_HEADER} must be positive")
+    return min(timeout, limit)
+
+
+async def _watch_disconnect(request, deadline: Deadline):
+    while not deadline.cancelled:
+        if await request.is_disconnected():
+            deadline.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+async def run_with_deadline(request, deadline: Deadline, fn, *args):
+    # Синхронная работа в пуле потоков под сроком запроса; отключение клиента отменяет ее
+    def call():
+        with deadline_scope(deadline):
+            return fn(*args)
+
+    watcher = asyncio.create_task(_watch_disconnect(request, deadline))
+    try:
+        return await run_in_threadpool(call)
+    finally:
+        watcher.cancel()
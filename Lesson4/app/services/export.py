@@ -0,0 +1,241 @@
+import gzip
+import importlib.util
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+from sqlalchemy import select, update
+
+from app.database.config import SessionLocal, read_session_for_user
+from app.models.account import Account
+from app.models.export_job import ExportJob
+from app.models.prediction import Prediction
+from app.models.transaction import Transaction
+from app.services.text_store import load_inputs
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "./data/exports")
+# Строк за одну выборку из курсора и за одну запись в файл: память не зависит от размера истории
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+# Как часто идущая выгрузка отмечает прогресс (updated_at); должно быть меньше
+# EXPORT_STALE_TIMEOUT в app.services.maintenance
+EXPORT_HEARTBEAT_INTERVAL = float(os.getenv("EXPORT_HEARTBEAT_INTERVAL", "30"))
+
+DATASETS = ("predictions", "transactions")
+FORMATS = ("jsonl", "parquet")
+EXTENSIONS = {"jsonl": "jsonl.gz", "parquet": "parquet"}
+MEDIA_TYPES = {"jsonl": "application/gzip", "parquet": "application/vnd.apache.parquet"}
+
+PREDICTION_EXPORT_COLUMNS = [
+    Prediction.id, Prediction.input_hash, Prediction.input_preview, Prediction.summary,
+    Prediction.model_used, Prediction.cost, Prediction.processing_time, Prediction.created_at,
+]
+TRANSACTION_EXPORT_COLUMNS = [
+    Transaction.id, Transaction.amount, Transaction.type, Transaction.description, Transaction.created_at,
+]
+
+# pyarrow опционален (без него доступен только JSONL) и тяжел при импорте (~250 мс):
+# при старте проверяется только наличие пакета, импорт — в первой выгрузке Parquet
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+def available_formats():
+    return [f for f in FORMATS if f != "parquet" or PARQUET_AVAILABLE]
+
+def create_export_job(db, user_id: int, dataset: str, format: str, include_input: bool = False) -> ExportJob:
+    job = ExportJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        dataset=dataset,
+        format=format,
+        include_input=include_input and dataset == "predictions",
+        status="pending",
+        rows=0,
+        updated_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def has_active_export(db, user_id: int) -> bool:
+    return db.query(ExportJob.id).filter(
+        ExportJob.user_id == user_id, ExportJob.status.in_(("pending", "running"))
+    ).first() is not None
+
+def export_path(job: ExportJob) -> str:
+    return os.path.join(EXPORT_DIR, f"{job.id}.{EXTENSIONS[job.format]}")
+
+def export_filename(job: ExportJob) -> str:
+    return f"{job.dataset}-{job.id}.{EXTENSIONS[job.format]}"
+
+def _export_query(job: ExportJob):
+    if job.dataset == "predictions":
+        return select(*PREDICTION_EXPORT_COLUMNS).where(
+            Prediction.user_id == job.user_id
+        ).order_by(Prediction.id)
+    account_ids = select(Account.id).where(Account.user_id == job.user_id).scalar_subquery()
+    return select(*TRANSACTION_EXPORT_COLUMNS).where(
+        Transaction.account_id.in_(account_ids)
+    ).order_by(Transaction.id)
+
+def _fields(job: ExportJob):
+    columns = PREDICTION_EXPORT_COLUMNS if job.dataset == "predictions" else TRANSACTION_EXPORT_COLUMNS
+    fields = [c.key for c in columns]
+    if job.include_input:
+        fields.append("input_text")
+    return fields
+
+def iter_chunks(db, job: ExportJob):
+    # yield_per: на PostgreSQL серверный курсор, на SQLite fetchmany; в памяти только один чанк
+    result = db.execute(_export_query(job).execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    for partition in result.partitions():
+        rows = [list(row) for row in partition]
+        if job.include_input:
+            texts = load_inputs(db, {row[1] for row in rows})
+            for row in rows:
+                row.append(texts.get(row[1]))
+        yield rows
+
+def _with_heartbeat(db, job: ExportJob, chunks):
+    # Отметка прогресса между чанками: живое задание не примут за брошенное
+    last = time.monotonic()
+    for rows in chunks:
+        yield rows
+        if time.monotonic() - last >= EXPORT_HEARTBEAT_INTERVAL:
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            last = time.monotonic()
+
+def _dumps(record: dict) -> bytes:
+    return orjson.dumps(record) + b"\n"
+
+def _write_jsonl(path, fields, chunks) -> int:
+    count = 0
+    with gzip.open(path, "wb", compresslevel=EXPORT_GZIP_LEVEL) as f:
+        for rows in chunks:
+            f.write(b"".join(_dumps(dict(zip(fields, row))) for row in rows))
+            count += len(rows)
+    return count
+
+def _parquet_schema(job: ExportJob):
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    if job.dataset == "predictions":
+        columns = [
+            ("id", pa.int64()), ("input_hash", pa.string()), ("input_preview", pa.string()),
+            ("summary", pa.string()), ("model_used", pa.string()), ("cost", pa.float64()),
+            ("processing_time", pa.float64()), ("created_at", timestamp),
+        ]
+        if job.include_input:
+            columns.append(("input_text", pa.string()))
+    else:
+        columns = [
+            ("id", pa.int64()), ("amount", pa.float64()), ("type", pa.string()),
+            ("description", pa.string()), ("created_at", timestamp),
+        ]
+    return pa.schema(columns)
+
+def _write_parquet(path, schema, chunks) -> int:
+    # Каждый чанк — отдельная row group; колонки собираются из строк без промежуточных dict
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            columns = list(zip(*rows)) if rows else [[] for _ in schema]
+            arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+def run_export(job_id: str, use_replica: bool = True):
+    # Выполняется в фоне (BackgroundTasks): статус пишется в основную БД, данные читаются
+    # так же, как в API-чтениях (Settings.read_replica, read-your-writes)
+    db = SessionLocal()
+    read_db = None
+    tmp_path = None
+    try:
+        job = db.get(ExportJob, job_id)
+        if job is None or job.status != "pending":
+            return
+        read_db = read_session_for_user(job.user_id, use_replica)
+        job.status = "running"
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = export_path(job)
+        tmp_path = path + ".tmp"
+        chunks = _with_heartbeat(db, job, iter_chunks(read_db, job))
+        if job.format == "parquet":
+            rows = _write_parquet(tmp_path, _parquet_schema(job), chunks)
+        else:
+            rows = _write_jsonl(tmp_path, _fields(job), chunks)
+        # Файл появляется под итоговым именем только целиком
+        os.replace(tmp_path, path)
+        tmp_path = None
+
+        job.rows = rows
+        job.size = os.path.getsize(path)
+        job.status = "done"
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        job = db.get(ExportJob, job_id)
+        if job is not None:
+            job.status = "failed"
+            job.error = str(e)[:500]
+            job.finished_at = job.updated_at = datetime.utcnow()
+            db.commit()
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if read_db is not None:
+            read_db.close()
+        db.close()
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def fail_stale_exports(db, older_than: timedelta) -> int:
+    # Задания, брошенные упавшим или перезапущенным воркером (BackgroundTasks не переживает
+    # рестарт): помечаются failed, пользователь может запустить выгрузку заново
+    cutoff = datetime.utcnow() - older_than
+    job_ids = [
+        job_id for (job_id,) in db.query(ExportJob.id)
+        .filter(ExportJob.status.in_(("pending", "running")), ExportJob.updated_at < cutoff)
+    ]
+    failed = 0
+    for job_id in job_ids:
+        now = datetime.utcnow()
+        # Условный UPDATE: задание, отметившееся после выборки, не трогаем
+        result = db.execute(
+            update(ExportJob)
+            .where(ExportJob.id == job_id, ExportJob.status.in_(("pending", "running")), ExportJob.updated_at < cutoff)
+            .values(status="failed", error="Export was interrupted", finished_at=now, updated_at=now)
+        )
+        db.commit()
+        if result.rowcount == 1:
+            job = db.get(ExportJob, job_id)
+            _remove(export_path(job) + ".tmp")
+            failed += 1
+    return failed
+
+def expire_old_exports(db, older_than: timedelta) -> int:
+    # Готовые файлы старше срока хранения удаляются, задание остается со статусом expired
+    cutoff = datetime.utcnow() - older_than
+    jobs = db.query(ExportJob).filter(ExportJob.status == "done", ExportJob.finished_at < cutoff).all()
+    for job in jobs:
+        _remove(export_path(job))
+        job.status = "expired"
+        job.updated_at = datetime.utcnow()
+    db.commit()
+    return len(jobs)
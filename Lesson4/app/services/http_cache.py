@@ -0,0 +1,38 @@
+from fastapi import Response
+
+# Сохраненные предсказания не меняются: клиент и nginx могут кэшировать их сколько угодно
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Суффиксы, которые CompressionMiddleware раньше добавлял к ETag сжатых представлений:
+# If-None-Match от клиентов, закэшировавших такие ETag, по-прежнему совпадает
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+def make_etag(value: str, variant: str = "") -> str:
+    return f'"{value}{variant}"'
+
+def _normalize(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    expected = _normalize(etag)
+    return any(_normalize(tag) == expected for tag in if_none_match.split(","))
+
+def cache_headers(etag: str) -> dict:
+    # ETag один на все кодировки, представления различаются через Vary. 304 несет те же
+    # заголовки, что и 200: сожмет ли CompressionMiddleware тело, зависит от его размера,
+    # а у пустого 304 его не узнать
+    return {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+
+from starlette.concurrency import run_in_threadpool
+
+from app.database.config import SessionLocal
+from app.services.crud.account import release_stale_holds
+from app.services.export import expire_old_exports, fail_stale_exports
+from app.services.revocation import purge_expired
+from app.services.usage import refresh_usage_rollups
+
+logger = logging.getLogger(__name__)
+
+# Периодическая фоновая работа воркера API: rollup использования, возврат зависших резервов,
+# брошенные и устаревшие выгрузки, очистка журнала отзыва токенов.
+# Несколько воркеров gunicorn безопасны: шаги идемпотентны (условные UPDATE).
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "60"))  # 0 — выключено
+# Резерв старше этого считается брошенным (процесс упал между резервом и списанием);
+# должен быть больше самого долгого срока запроса
+STALE_HOLD_TIMEOUT = float(os.getenv("STALE_HOLD_TIMEOUT", "900"))
+# Выгрузка pending/running без отметки прогресса дольше этого считается брошенной
+EXPORT_STALE_TIMEOUT = float(os.getenv("EXPORT_STALE_TIMEOUT", "600"))
+# Сколько хранятся готовые файлы выгрузок
+EXPORT_RETENTION = float(os.getenv("EXPORT_RETENTION", str(7 * 24 * 3600)))
+
+
+def run_maintenance() -> dict:
+    db = SessionLocal()
+    try:
+        return {
+            "rolled_up": refresh_usage_rollups(db),
+            "released_holds": release_stale_holds(db, timedelta(seconds=STALE_HOLD_TIMEOUT)),
+            "failed_exports": fail_stale_exports(db, timedelta(seconds=EXPORT_STALE_TIMEOUT)),
+            "expired_exports": expire_old_exports(db, timedelta(seconds=EXPORT_RETENTION)),
+            "purged_revocations": purge_expired(db),
+        }
+    finally:
+        db.close()
+
+
+async def maintenance_loop(interval: float = MAINTENANCE_INTERVAL):
+    while True:
+        try:
+            await run_in_threadpool(run_maintenance)
+        except Exception:
+            logger.exception("Maintenance step failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,175 @@
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# ========== ПОИСК ПОЧТИ-ДУБЛИКАТОВ (MinHash + LSH) ==========
+# Одна и та же статья с мелкими отличиями (пробелы, шапка, arXiv v2) не совпадает
+# по точному хэшу, но имеет высокое сходство Жаккара по шинглам из слов.
+# Индекс: сигнатуры MinHash, разбитые на полосы (LSH), хранится в памяти и
+# дописывается в локальный файл фиксированными записями.
+
+NEAR_DUP_REUSE = os.getenv("NEAR_DUP_REUSE", "0") == "1"
+# Индекс читает только переиспользование, поэтому по умолчанию он ведется вместе с ним;
+# NEAR_DUP_INDEX=on без NEAR_DUP_REUSE наполняет индекс заранее, до включения переиспользования
+NEAR_DUP_INDEX = os.getenv("NEAR_DUP_INDEX", "on" if NEAR_DUP_REUSE else "off") == "on"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", "./data/near_dup.idx")
+
+NUM_PERM = 128
+BANDS = 16  # 16 полос x 8 строк: порог срабатывания LSH около 0.7
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+_CHUNK = 4096  # шинглов за проход, чтобы матрица (NUM_PERM x chunk) не росла с размером текста
+
+# numpy (~100 мс импорта) загружается при первой суммаризации, а не при старте приложения
+@lru_cache(maxsize=None)
+def _permutations():
+    # (простое Мерсенна, маска 32 бит, a, b) для NUM_PERM хэш-функций вида (a*x + b) mod p
+    import numpy as np
+
+    rng = np.random.RandomState(1)
+    perm_a = rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+    perm_b = rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+    return np.uint64((1 << 61) - 1), np.uint64((1 << 32) - 1), perm_a, perm_b
+
+@lru_cache(maxsize=None)
+def record_dtype():
+    import numpy as np
+
+    return np.dtype([("key", "S64"), ("model", "S32"), ("sig", "<u4", (NUM_PERM,))])
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def shingle_hashes(text: str) -> "np.ndarray":
+    # 32-битные хэши шинглов из SHINGLE_SIZE слов; слова хэшируются один раз,
+    # окна комбинируются векторно
+    import numpy as np
+
+    _, max_hash, _, _ = _permutations()
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    windows = np.lib.stride_tricks.sliding_window_view(word_hashes, SHINGLE_SIZE)
+    mixers = np.array([0x9E3779B1 * (i + 1) for i in range(SHINGLE_SIZE)], dtype=np.uint64)
+    combined = (windows * mixers).sum(axis=1)  # переполнение uint64 здесь допустимо
+    combined ^= combined >> np.uint64(29)
+    return np.unique(combined & max_hash)
+
+def minhash_signature(text: str):
+    import numpy as np
+
+    hashes = shingle_hashes(text)
+    if hashes.size == 0:
+        return None
+    prime, max_hash, perm_a, perm_b = _permutations()
+    signature = np.full(NUM_PERM, max_hash, dtype=np.uint64)
+    for start in range(0, hashes.size, _CHUNK):
+        chunk = hashes[start:start + _CHUNK]
+        values = (perm_a[:, None] * chunk[None, :] + perm_b[:, None]) % prime & max_hash
+        np.minimum(signature, values.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+def estimate_jaccard(sig_a: "np.ndarray", sig_b: "np.ndarray") -> float:
+    import numpy as np
+
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+class NearDuplicateIndex:
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = []
+        self._signatures = []
+        self._bands = [defaultdict(list) for _ in range(BANDS)]
+        self._known = set()
+        self._offset = 0
+
+    def _insert(self, key, signature):
+        if key in self._known:
+            return False
+        position = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(signature)
+        self._known.add(key)
+        for band, table in enumerate(self._bands):
+            table[signature[band * ROWS:(band + 1) * ROWS].tobytes()].append(position)
+        return True
+
+    def _refresh(self):
+        # Подхватываем записи, дописанные другими воркерами
+        if not self.path or not os.path.exists(self.path):
+            return
+        import numpy as np
+
+        dtype = record_dtype()
+        size = os.path.getsize(self.path)
+        usable = size - size % dtype.itemsize
+        if usable <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            records = np.frombuffer(f.read(usable - self._offset), dtype=dtype)
+        for record in records:
+            self._insert((record["key"].decode(), record["model"].decode()), record["sig"].copy())
+        self._offset = usable
+
+    def add(self, input_hash: str, model_type: str, signature: "np.ndarray"):
+        key = (input_hash, model_type)
+        with self._lock:
+            self._refresh()
+            if not self._insert(key, signature):
+                return
+            if self.path:
+                import numpy as np
+
+                record = np.zeros(1, dtype=record_dtype())
+                record["key"], record["model"], record["sig"] = input_hash, model_type[:32], signature
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write(record.tobytes())
+                self._offset += record_dtype().itemsize
+
+    def find(self, signature: "np.ndarray", model_type: str, threshold: float = NEAR_DUP_THRESHOLD,
+             limit: int = 16):
+        # Кандидаты (input_hash, сходство) с той же моделью не ниже порога, лучшие первыми
+        with self._lock:
+            self._refresh()
+            candidates = set()
+            for band, table in enumerate(self._bands):
+                candidates.update(table.get(signature[band * ROWS:(band + 1) * ROWS].tobytes(), ()))
+            candidates = [i for i in candidates if self._keys[i][1] == model_type]
+            if not candidates:
+                return []
+            import numpy as np
+
+            matrix = np.stack([self._signatures[i] for i in candidates])
+        similarities = (matrix == signature).mean(axis=1)
+        order = np.argsort(-similarities, kind="stable")[:limit]
+        return [
+            (self._keys[candidates[i]][0], float(similarities[i]))
+            for i in order if similarities[i] >= threshold
+        ]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index() -> NearDuplicateIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(NEAR_DUP_INDEX_PATH)
+        return _index
@@ -0,0 +1,235 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app.database.config import mark_write
+from app.models.account import Account
+from app.models.prediction import Prediction
+from app.services.access_log import annotate
+from app.services.crud.account import place_hold, capture_hold, release_hold
+from app.services.deadline import RequestAborted, check_deadline, submit_with_context
+from app.services.near_dup import NEAR_DUP_INDEX, NEAR_DUP_REUSE, minhash_signature, get_index as get_near_dup_index
+from app.services.pricing import price_request, price_batch
+from app.services.resilience import BackendUnavailable
+from app.services.summarizer import summarize_coalesced, extractive_summary, input_key, result_hash
+from app.services.text_store import store_input, make_preview
+from app.services.tracing import span
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+# Сколько заявок пачки суммаризируется параллельно
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# Недоступный бэкенд модели (разомкнут breaker, заняты все слоты) подменяется экстрактивной
+# суммаризацией без модели; BACKEND_FALLBACK=0 — сразу отказ (503)
+BACKEND_FALLBACK = os.getenv("BACKEND_FALLBACK", "1") == "1"
+FALLBACK_MODEL = "extractive"
+# Подмена оплачивается по тарифу этой модели, но не дороже запрошенной
+FALLBACK_PRICING_MODEL = "default"
+
+_batch_pool = None
+
+class SummarizationFailed(Exception):
+    pass
+
+def get_batch_pool() -> ThreadPoolExecutor:
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+    return _batch_pool
+
+def find_near_duplicate_summary(db: Session, user_id: int, signature, model_type: str):
+    # Почти-дубликат текста, уже суммаризированного этим пользователем (MinHash/LSH):
+    # переиспользуем его результат. Индекс общий, поэтому чужие тексты отсекаются здесь
+    if not NEAR_DUP_REUSE or signature is None:
+        return None
+    matches = get_near_dup_index().find(signature, model_type)
+    if not matches:
+        return None
+    summaries = dict(db.query(Prediction.input_hash, Prediction.summary).filter(
+        Prediction.user_id == user_id,
+        Prediction.input_hash.in_([input_hash for input_hash, _ in matches]),
+        Prediction.model_used == model_type,
+    ).all())
+    for input_hash, _ in matches:
+        if input_hash in summaries:
+            return summaries[input_hash]
+    return None
+
+def get_account(db: Session, user_id: int) -> Account:
+    with span("billing.get_account"):
+        account = db.query(Account).filter(Account.user_id == user_id).first()
+    if not account:
+        raise ValueError("Account not found")
+    return account
+
+def insufficient_balance(account: Account, cost: float) -> ValueError:
+    available = account.balance + (account.credit_limit or 0) - account.held
+    return ValueError(f"Insufficient balance. Required: {cost}, Available: {round(available, 4)}")
+
+def new_prediction(db: Session, user_id: int, text: str, model_type: str, summary: str,
+                   cost: float, processing_time: float) -> Prediction:
+    # Текст сохраняется сжатым и один раз на содержимое
+    input_hash = store_input(db, text, input_key(text)[0])
+    prediction = Prediction(
+        user_id=user_id,
+        input_hash=input_hash,
+        input_preview=make_preview(text),
+        summary=summary,
+        result_hash=result_hash(input_hash, model_type, summary),
+        model_used=model_type,
+        cost=cost,
+        processing_time=processing_time,
+    )
+    db.add(prediction)
+    return prediction
+
+def reserve_funds(db: Session, account: Account, amount: float, description: str) -> int:
+    # Быстрый атомарный резерв; возвращает id резерва для последующего списания или возврата
+    try:
+        return place_hold(db, account.id, amount, description).id
+    except ValueError as e:
+        if str(e) == "Insufficient funds":
+            raise insufficient_balance(account, amount)
+        raise
+
+def summarize_with_fallback(text: str, model_type: str):
+    # Возвращает (summary, model_used, shared)
+    with span("summarizer.summarize", **{"summarizer.model": model_type, "summarizer.chars": len(text)}) as current:
+        try:
+            summary, shared = summarize_coalesced(text, model_type)
+            current.set_attribute("summarizer.single_flight_shared", shared)
+            return summary, model_type, shared
+        except BackendUnavailable as e:
+            if not BACKEND_FALLBACK:
+                raise
+            current.set_attribute("summarizer.fallback", type(e).__name__)
+            return extractive_summary(text), FALLBACK_MODEL, False
+
+def fallback_cost(text: str, cost: float) -> float:
+    return min(cost, price_request(text, FALLBACK_PRICING_MODEL))
+
+def summarize_for_user(db: Session, user_id: int, text: str, model_type: str = "default") -> Prediction:
+    # Общий путь суммаризации для API и бота: цена -> резерв -> модель -> списание (или возврат).
+    # Ошибки оплаты и тарификации — ValueError (PricingError), их текст можно показывать пользователю;
+    # сбой или недоступность модели — SummarizationFailed, резерв при этом возвращается.
+    # Истекший или отмененный запрос (RequestAborted) не начинается, а прерванный — не оплачивается.
+    check_deadline()
+    cost = price_request(text, model_type)
+    account = get_account(db, user_id)
+    hold_id = reserve_funds(db, account, cost, f"Payment for prediction: {model_type}")
+    mark_write(user_id)
+
+    start_time = time.time()
+    try:
+        signature = minhash_signature(text) if NEAR_DUP_INDEX or NEAR_DUP_REUSE else None
+        summary = find_near_duplicate_summary(db, user_id, signature, model_type)
+    except Exception:
+        db.rollback()
+        release_hold(db, hold_id)
+        raise
+    # На время работы модели сессия закрыта: соединение пула не занято ожиданием инференса
+    db.close()
+
+    model_used = model_type
+    cache_hit = "near_dup" if summary is not None else None
+    if summary is None:
+        try:
+            # Одинаковые одновременные запросы считаются один раз
+            summary, model_used, shared = summarize_with_fallback(text, model_type)
+            cache_hit = "single_flight" if shared else None
+        except RequestAborted:
+            release_hold(db, hold_id)
+            raise
+        except BackendUnavailable as e:
+            release_hold(db, hold_id)
+            raise SummarizationFailed(f"{e}, the reserved funds were released") from e
+        except Exception as e:
+            release_hold(db, hold_id)
+            raise SummarizationFailed("Summarization failed, the reserved funds were released") from e
+    processing_time = time.time() - start_time
+    if model_used != model_type:
+        cost = fallback_cost(text, cost)
+
+    try:
+        prediction = new_prediction(db, user_id, text, model_used, summary, cost, processing_time)
+        # Результат и списание фиксируются одной транзакцией
+        capture_hold(db, hold_id, cost)
+    except Exception:
+        db.rollback()
+        release_hold(db, hold_id)
+        raise
+    db.refresh(prediction)
+    if NEAR_DUP_INDEX and signature is not None and model_used == model_type:
+        get_near_dup_index().add(prediction.input_hash, model_type, signature)
+    annotate(model=model_used, cost=cost, summarizer_ms=round(processing_time * 1000, 2), cache_hit=cache_hit)
+    return prediction
+
+def _timed_summary(text: str, model_type: str):
+    check_deadline()  # заявка, дождавшаяся очереди после срока, не запускается
+    start_time = time.time()
+    summary, model_used, _ = summarize_with_fallback(text, model_type)
+    return summary, model_used, time.time() - start_time
+
+def summarize_batch_for_user(db: Session, user_id: int, items):
+    # items — список (text, model_type). Вся пачка тарифицируется одним векторным проходом
+    # и резервируется одним атомарным hold до работы модели; после — списывается стоимость
+    # успешных заявок, остальное освобождается. Возвращает (results, hold), где results[i] —
+    # Prediction или Exception.
+    if not items:
+        raise ValueError("Empty batch")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Too many items: {len(items)} > {BATCH_MAX_ITEMS}")
+    check_deadline()
+    texts = [text for text, _ in items]
+    models = [model_type for _, model_type in items]
+    prices = price_batch(texts, models)
+    total = round(float(prices.sum()), 4)
+
+    account = get_account(db, user_id)
+    hold_id = reserve_funds(db, account, total, f"Payment for batch of {len(items)} predictions")
+    mark_write(user_id)
+
+    try:
+        # Почти-дубликаты ищутся в этом потоке (нужна сессия), модель — в пуле
+        signatures = [
+            minhash_signature(text) if NEAR_DUP_INDEX or NEAR_DUP_REUSE else None for text in texts
+        ]
+        reused = [
+            find_near_duplicate_summary(db, user_id, signature, model_type)
+            for signature, model_type in zip(signatures, models)
+        ]
+        db.close()  # на время работы модели сессия закрыта
+        # Срок запроса доходит до потоков пула через contextvars
+        futures = {
+            i: submit_with_context(get_batch_pool(), _timed_summary, texts[i], models[i])
+            for i in range(len(items)) if reused[i] is None
+        }
+
+        results = []
+        captured = 0.0
+        for i in range(len(items)):
+            try:
+                summary, model_used, processing_time = (
+                    (reused[i], models[i], 0.0) if reused[i] is not None else futures[i].result()
+                )
+            except Exception as e:
+                results.append(e)
+                continue
+            cost = float(prices[i]) if model_used == models[i] else fallback_cost(texts[i], float(prices[i]))
+            results.append(new_prediction(db, user_id, texts[i], model_used, summary, cost, processing_time))
+            captured += cost
+        # Результаты и списание фиксируются одной транзакцией
+        hold = capture_hold(db, hold_id, round(captured, 4))
+        annotate(items=len(items), cost=hold.captured_amount)
+    except Exception:
+        db.rollback()
+        release_hold(db, hold_id)
+        raise
+
+    for result, signature, model_type in zip(results, signatures, models):
+        if isinstance(result, Prediction):
+            db.refresh(result)
+            if NEAR_DUP_INDEX and signature is not None and result.model_used == model_type:
+                get_near_dup_index().add(result.input_hash, model_type, signature)
+    return results, hold
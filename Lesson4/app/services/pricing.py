@@ -0,0 +1,115 @@
+import json
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Цена считается по размеру запроса до любой работы модели: токены оцениваются по длине
+# текста, без токенизации. Тарифы — ступенчатые (как налоговая шкала): каждая ступень
+# оплачивается по своей ставке за 1000 токенов.
+CHARS_PER_TOKEN = 4
+PRICE_DECIMALS = 4
+
+# model_type -> base (за запрос), tiers [(до токенов, цена за 1000 токенов)], max_tokens
+DEFAULT_MODEL_PRICING = {
+    "default": {
+        "base": 0.5,
+        "tiers": [(2000, 0.25), (20000, 0.15), (None, 0.1)],
+        "max_tokens": 200000,
+    },
+    "large": {
+        "base": 1.0,
+        "tiers": [(2000, 1.0), (20000, 0.6), (None, 0.4)],
+        "max_tokens": 100000,
+    },
+}
+
+# PRICING_FILE — JSON того же вида для переопределения тарифов без изменения кода
+PRICING_FILE = os.getenv("PRICING_FILE")
+
+
+class PricingError(ValueError):
+    pass
+
+
+class UnknownModelError(PricingError):
+    pass
+
+
+class RequestTooLargeError(PricingError):
+    pass
+
+
+def _load_pricing():
+    if not PRICING_FILE:
+        return DEFAULT_MODEL_PRICING
+    with open(PRICING_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _ModelTariff:
+    def __init__(self, config):
+        import numpy as np
+
+        self.base = float(config["base"])
+        self.max_tokens = int(config["max_tokens"])
+        bounds = [np.inf if upper is None else float(upper) for upper, _ in config["tiers"]]
+        self.lower = np.array([0.0] + bounds[:-1])
+        self.width = np.array(bounds) - self.lower
+        self.rates = np.array([float(rate) for _, rate in config["tiers"]]) / 1000
+
+    def price(self, tokens: "np.ndarray") -> "np.ndarray":
+        # (n, 1) - (tiers,) -> токены каждой заявки на каждой ступени
+        import numpy as np
+
+        per_tier = np.clip(tokens[:, None] - self.lower, 0, self.width)
+        return np.round(self.base + per_tier @ self.rates, PRICE_DECIMALS)
+
+
+# Тарифы (и numpy, ~100 мс импорта) загружаются при первом расчете цены, а не при старте
+@lru_cache(maxsize=None)
+def model_tariffs() -> dict:
+    return {name: _ModelTariff(config) for name, config in _load_pricing().items()}
+
+
+def estimate_tokens(lengths) -> "np.ndarray":
+    import numpy as np
+
+    return np.ceil(np.asarray(lengths, dtype=np.float64) / CHARS_PER_TOKEN)
+
+
+def price_batch(texts, model_types) -> "np.ndarray":
+    # Цены всех заявок пачки за один векторный проход по каждой модели.
+    # Неизвестная модель или превышение max_tokens — PricingError с номером заявки.
+    import numpy as np
+
+    tokens = estimate_tokens([len(t) for t in texts])
+    models = np.asarray(model_types, dtype=object)
+    prices = np.empty(len(tokens))
+    for model in set(model_types):
+        tariff = model_tariffs().get(model)
+        index = np.flatnonzero(models == model)
+        if tariff is None:
+            raise UnknownModelError(f"Item {index[0]}: unknown model_type '{model}'")
+        too_large = index[tokens[index] > tariff.max_tokens]
+        if too_large.size:
+            raise RequestTooLargeError(
+                f"Item {too_large[0]}: ~{int(tokens[too_large[0]])} tokens exceeds the limit "
+                f"of {tariff.max_tokens} for model '{model}'"
+            )
+        prices[index] = tariff.price(tokens[index])
+    return prices
+
+
+def price_request(text: str, model_type: str = "default") -> float:
+    tariff = model_tariffs().get(model_type)
+    if tariff is None:
+        raise UnknownModelError(f"Unknown model_type '{model_type}'")
+    tokens = estimate_tokens([len(text)])
+    if tokens[0] > tariff.max_tokens:
+        raise RequestTooLargeError(
+            f"~{int(tokens[0])} tokens exceeds the limit of {tariff.max_tokens} for model '{model_type}'"
+        )
+    return float(tariff.price(tokens)[0])
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import deque
+
+from app.services.deadline import RequestAborted
+
+# Изоляция бэкендов суммаризации (по model_type): у каждого свой ограниченный пул слотов
+# (bulkhead) и свой circuit breaker. Медленная тяжелая модель не занимает все потоки воркера
+# и не тормозит default и остальные эндпоинты: лишние вызовы сразу отклоняются.
+
+# Одновременных вызовов на бэкенд; тяжелой модели — меньше
+BULKHEAD_SIZE = int(os.getenv("BULKHEAD_SIZE", "8"))
+BULKHEAD_SIZES = {"large": int(os.getenv("BULKHEAD_SIZE_LARGE", "4"))}
+# Сколько ждать свободный слот, прежде чем отклонить вызов
+BULKHEAD_MAX_WAIT = float(os.getenv("BULKHEAD_MAX_WAIT", "0.5"))
+# Breaker считает последние BREAKER_WINDOW вызовов; размыкается, если из них (при не менее
+# BREAKER_MIN_CALLS) доля ошибок >= BREAKER_FAILURE_RATE или доля вызовов дольше
+# BREAKER_SLOW_CALL секунд >= BREAKER_SLOW_RATE
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL = float(os.getenv("BREAKER_SLOW_CALL", "10"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+# Сколько breaker разомкнут до пробных вызовов (half-open) и сколько пробных вызовов пускать
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+class CircuitOpen(BackendUnavailable):
+    pass
+
+
+class BulkheadFull(BackendUnavailable):
+    pass
+
+
+class Bulkhead:
+    def __init__(self, size: int, max_wait: float = BULKHEAD_MAX_WAIT):
+        self.size = size
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+
+    def acquire(self, name: str):
+        if not self._slots.acquire(timeout=self.max_wait):
+            with self._lock:
+                self.rejected += 1
+            raise BulkheadFull(f"Backend '{name}' is at its concurrency limit ({self.size})")
+        with self._lock:
+            self.active += 1
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "active": self.active, "rejected": self.rejected}
+
+
+class CircuitBreaker:
+    def __init__(self, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, slow_call: float = BREAKER_SLOW_CALL,
+                 slow_rate: float = BREAKER_SLOW_RATE, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 half_open_calls: int = BREAKER_HALF_OPEN_CALLS):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # (failed, slow)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0  # пробные вызовы, начатые в half-open
+        self._trial_successes = 0
+        self.opened = 0
+        self.short_circuited = 0
+
+    def allow(self, name: str):
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self._opened_at + self.open_seconds - time.monotonic()
+                if retry_in > 0:
+                    self.short_circuited += 1
+                    raise CircuitOpen(f"Backend '{name}' is unavailable, retry in {retry_in:.0f} s")
+                self.state = HALF_OPEN
+                self._trials = self._trial_successes = 0
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.short_circuited += 1
+                    raise CircuitOpen(f"Backend '{name}' is recovering, retry later")
+                self._trials += 1
+
+    def release_trial(self):
+        # Разрешенный вызов не состоялся (нет слота, запрос прерван) — пробный слот освобождается
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record(self, failed: bool, duration: float):
+        slow = duration >= self.slow_call
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # Пробные вызовы решают: сбой — снова размыкаем, все успешны — замыкаем
+                if failed or slow:
+                    self._open()
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self.state = CLOSED
+                        self._outcomes.clear()
+                return
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls or self.state != CLOSED:
+                return
+            failures = sum(f for f, _ in self._outcomes)
+            slow_calls = sum(s for _, s in self._outcomes)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_rate:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "failure_rate": round(sum(f for f, _ in self._outcomes) / calls, 4) if calls else 0.0,
+                "slow_rate": round(sum(s for _, s in self._outcomes) / calls, 4) if calls else 0.0,
+                "opened": self.opened,
+                "short_circuited": self.short_circuited,
+            }
+
+
+class BackendGuard:
+    # Вызов бэкенда через breaker и bulkhead. Прерванные по сроку запроса вызовы не считаются
+    # ошибкой бэкенда, но учитываются как медленные, если длились дольше порога
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.bulkhead = Bulkhead(size)
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def call(self, fn, *args):
+        self.breaker.allow(self.name)
+        try:
+            self.bulkhead.acquire(self.name)
+        except BulkheadFull:
+            self.breaker.release_trial()
+            raise
+        start = time.monotonic()
+        try:
+            result = fn(*args)
+        except RequestAborted:
+            duration = time.monotonic() - start
+            if duration >= self.breaker.slow_call:
+                self._record(False, duration)
+            else:
+                self.breaker.release_trial()
+            raise
+        except Exception:
+            self._record(True, time.monotonic() - start)
+            raise
+        else:
+            self._record(False, time.monotonic() - start)
+            return result
+        finally:
+            self.bulkhead.release()
+
+    def _record(self, failed: bool, duration: float):
+        self.breaker.record(failed, duration)
+        with self._lock:
+            self.calls += 1
+            self.failures += failed
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = {"calls": self.calls, "failures": self.failures}
+        return {**totals, "breaker": self.breaker.stats(), "bulkhead": self.bulkhead.stats()}
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(model_type: str) -> BackendGuard:
+    guard = _guards.get(model_type)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(model_type)
+            if guard is None:
+                guard = _guards[model_type] = BackendGuard(model_type, BULKHEAD_SIZES.get(model_type, BULKHEAD_SIZE))
+    return guard
+
+
+def guards_stats() -> dict:
+    with _guards_lock:
+        guards = dict(_guards)
+    return {name: guard.stats() for name, guard in sorted(guards.items())}
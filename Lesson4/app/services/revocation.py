@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.database.config import SessionLocal
+from app.models.token_revocation import TokenRevocation
+
+# Отзыв access-токенов до истечения срока (выход, деактивация пользователя).
+# Журнал — таблица token_revocations, общая для всех воркеров gunicorn. Каждый воркер держит
+# копию (jti -> exp, пользователь -> момент отзыва) и не чаще раза в REVOCATION_SYNC_INTERVAL
+# секунд догружает записи с revoked_at не раньше прошлой синхронизации минус REVOCATION_SYNC_MARGIN.
+# Водяной знак по id не годится: на PostgreSQL id выдается до коммита, и запись из долгой
+# транзакции появляется под id меньше уже прочитанного. Перекрытие окон дает повторы, но копия
+# идемпотентна (словарь по jti, максимум момента отзыва по пользователю).
+# Отзыв виден в своем воркере сразу, в остальных — не позже чем через REVOCATION_SYNC_INTERVAL.
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "2"))
+# Запас на длительность транзакции записи и расхождение часов между хостами
+REVOCATION_SYNC_MARGIN = int(os.getenv("REVOCATION_SYNC_MARGIN", "60"))
+# Срок жизни записи об отзыве пользователя: дольше токены не живут
+USER_REVOCATION_TTL = int(os.getenv("USER_REVOCATION_TTL", str(30 * 60)))
+
+_revoked_jti = {}
+_revoked_users = {}
+_synced_until = 0  # unix time начала последней синхронизации
+_synced_at = 0.0
+_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+
+def _remember(row: TokenRevocation):
+    # Под _lock
+    if row.jti:
+        _revoked_jti[row.jti] = row.expires_at
+    if row.user_id is not None:
+        _revoked_users[row.user_id] = max(_revoked_users.get(row.user_id, 0), row.revoked_at)
+
+
+def _record(db: Session, row: TokenRevocation):
+    db.add(row)
+    db.commit()
+    with _lock:
+        _remember(row)
+
+
+def revoke_token(db: Session, jti: str, expires_at: int):
+    _record(db, TokenRevocation(jti=jti, revoked_at=int(time.time()), expires_at=expires_at))
+
+
+def revoke_user(db: Session, user_id: int):
+    # Все токены пользователя, выданные до этого момента, недействительны
+    now = int(time.time())
+    _record(db, TokenRevocation(user_id=user_id, revoked_at=now, expires_at=now + USER_REVOCATION_TTL))
+
+
+def needs_sync() -> bool:
+    return time.monotonic() - _synced_at >= REVOCATION_SYNC_INTERVAL
+
+
+def sync():
+    # Догружает новые записи журнала; параллельные вызовы не ждут, а используют текущую копию
+    global _synced_until, _synced_at
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        if not needs_sync():
+            return
+        now = int(time.time())
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(TokenRevocation)
+                .filter(
+                    TokenRevocation.revoked_at >= _synced_until - REVOCATION_SYNC_MARGIN,
+                    TokenRevocation.expires_at > now,
+                )
+                .all()
+            )
+        finally:
+            db.close()
+        with _lock:
+            for row in rows:
+                _remember(row)
+            _synced_until = now
+            for key in [k for k, exp in _revoked_jti.items() if exp < now]:
+                del _revoked_jti[key]
+            for key in [k for k, at in _revoked_users.items() if at + USER_REVOCATION_TTL < now]:
+                del _revoked_users[key]
+        _synced_at = time.monotonic()
+    finally:
+        _sync_lock.release()
+
+
+def is_revoked(jti: str, user_id: int, issued_at: int) -> bool:
+    if jti in _revoked_jti:
+        return True
+    revoked_at = _revoked_users.get(user_id)
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def purge_expired(db: Session) -> int:
+    # Для фоновой задачи: записи, чьи токены уже истекли
+    deleted = db.query(TokenRevocation).filter(TokenRevocation.expires_at <= int(time.time())).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    return deleted
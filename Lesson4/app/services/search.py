@@ -0,0 +1,89 @@
+import re
+
+from sqlalchemy import DateTime, Float, func, literal, text
+from sqlalchemy.orm import Session
+
+from app.models.prediction import Prediction
+
+# Поиск по прошлым суммаризациям пользователя.
+# SQLite: FTS5 predictions_fts (bm25), PostgreSQL: GIN-индекс по выражению to_tsvector (ts_rank).
+# Индексы и триггеры создает миграция 0007. Прочие СУБД — подстроки (LIKE) без индекса
+# и ранжирования, новые записи первыми.
+
+SEARCH_FIELDS = ["id", "summary", "snippet", "input_preview", "model_used", "created_at", "rank"]
+
+_TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+def fts5_query(user_id: int, query: str):
+    # Каждое слово в кавычках: пользовательский ввод не интерпретируется как синтаксис FTS5.
+    # Слово с * на конце — поиск по префиксу.
+    terms = []
+    for token in _TOKEN_RE.findall(query):
+        if token.endswith("*"):
+            terms.append(f'"{token[:-1]}"*')
+        else:
+            terms.append(f'"{token}"')
+    if not terms:
+        return None
+    return f"user_key:u{int(user_id)} AND summary:({' AND '.join(terms)})"
+
+_SQLITE_SQL = text("""
+    SELECT p.id, p.summary,
+           snippet(predictions_fts, 0, '[', ']', '...', 12) AS snippet,
+           p.input_preview, p.model_used, p.created_at,
+           bm25(predictions_fts, 1.0, 0.0) AS rank
+    FROM predictions_fts
+    JOIN predictions p ON p.id = predictions_fts.rowid
+    WHERE predictions_fts MATCH :match
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+""").columns(created_at=DateTime, rank=Float)
+
+# Выражение to_tsvector совпадает с индексом ix_predictions_summary_tsv (миграция 0007)
+_POSTGRES_SQL = text("""
+    SELECT p.id, p.summary,
+           ts_headline('simple', p.summary, q, 'StartSel=[, StopSel=], MaxFragments=1') AS snippet,
+           p.input_preview, p.model_used, p.created_at,
+           -ts_rank(to_tsvector('simple', coalesce(p.summary, '')), q) AS rank
+    FROM predictions p, websearch_to_tsquery('simple', :query) q
+    WHERE p.user_id = :user_id AND to_tsvector('simple', coalesce(p.summary, '')) @@ q
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+""").columns(created_at=DateTime, rank=Float)
+
+SNIPPET_CHARS = 200
+
+def _like_pattern(term: str) -> str:
+    term = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{term}%"
+
+def _search_like(db: Session, user_id: int, query: str, limit: int, offset: int):
+    terms = [token.rstrip("*") for token in _TOKEN_RE.findall(query)]
+    if not terms:
+        return []
+    return (
+        db.query(
+            Prediction.id, Prediction.summary, func.substr(Prediction.summary, 1, SNIPPET_CHARS),
+            Prediction.input_preview, Prediction.model_used, Prediction.created_at, literal(0.0, Float),
+        )
+        .filter(Prediction.user_id == user_id,
+                *(Prediction.summary.ilike(_like_pattern(term), escape="\\") for term in terms))
+        .order_by(Prediction.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+
+def search_predictions(db: Session, user_id: int, query: str, limit: int = 20, offset: int = 0):
+    # Возвращает строки с колонками SEARCH_FIELDS, лучшие совпадения первыми
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        match = fts5_query(user_id, query)
+        if match is None:
+            return []
+        params = {"match": match, "limit": limit, "offset": offset}
+        return db.execute(_SQLITE_SQL, params).all()
+    if dialect == "postgresql":
+        params = {"query": query, "user_id": user_id, "limit": limit, "offset": offset}
+        return db.execute(_POSTGRES_SQL, params).all()
+    return _search_like(db, user_id, query, limit, offset)
@@ -0,0 +1,12 @@
+from fastapi.responses import ORJSONResponse
+
+# Ответы сериализуются orjson (класс ответа приложения по умолчанию — ORJSONResponse):
+# datetime и прочие типы колонок кодируются без jsonable_encoder
+
+def rows_to_dicts(rows, fields):
+    # Строки запроса по колонкам (не ORM-объекты) -> dict без промежуточных pydantic-моделей
+    return [dict(zip(fields, row)) for row in rows]
+
+def rows_response(rows, fields):
+    # Быстрый путь для горячих списков: одна сериализация вместо validate + jsonable_encoder + json
+    return ORJSONResponse(rows_to_dicts(rows, fields))
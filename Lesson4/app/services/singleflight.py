@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    # Склеивает одновременные вызовы с одинаковым ключом в одно вычисление:
+    # первый вызов считает, остальные ждут тот же Future.
+    # Кэша нет: после завершения ключ сразу освобождается.
+    # wait(future) — как ожидающие получают результат (например, с учетом своего срока).
+
+    def __init__(self, wait=None):
+        self._lock = threading.Condition()
+        self._calls = {}
+        self._wait = wait or Future.result
+
+    def do(self, key, fn, *args, **kwargs):
+        # Возвращает (результат, shared), shared=True если результат получен от чужого вызова
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return self._wait(future), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                self._lock.notify_all()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        # Ждем завершения всех текущих вычислений (используется при остановке)
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._calls, timeout)
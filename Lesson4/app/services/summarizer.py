@@ -0,0 +1,112 @@
+import hashlib
+import os
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from app.services.deadline import RequestAborted, check_deadline, sleep_with_deadline, current_deadline
+from app.services.resilience import get_guard
+from app.services.singleflight import SingleFlight
+from app.services.tracing import span
+from app.services.text_features import split_paragraphs, get_paragraph_features, rank_sentences
+
+_models_loaded = False
+
+def load_models():
+    # Загрузка моделей до fork воркеров (gunicorn preload_app): воркеры получают
+    # их через copy-on-write. Заглушке загружать нечего, сюда подключаются тяжелые бэкенды.
+    global _models_loaded
+    if _models_loaded:
+        return
+    _models_loaded = True
+
+# Имитация стоимости модели: полный проход по новому тексту — SUMMARIZER_LATENCY секунд,
+# абзацы из кэша признаков бесплатны
+SUMMARIZER_LATENCY = float(os.getenv("SUMMARIZER_LATENCY", "1.0"))
+# Своя задержка модели (например, чтобы имитировать медленный large)
+MODEL_LATENCY = {"large": float(os.getenv("SUMMARIZER_LATENCY_LARGE", str(SUMMARIZER_LATENCY)))}
+SUMMARY_SENTENCES = 3
+
+def _extract(text: str):
+    # Возвращает (summary, доля новых абзацев). Срок запроса (app.services.deadline)
+    # проверяется между абзацами
+    check_deadline()
+    if len(text) < 100:
+        return text[:50] + "...", 1.0
+    paragraphs = split_paragraphs(text)
+    features = []
+    uncached = 0
+    for paragraph in paragraphs:
+        check_deadline()
+        paragraph_features, cached = get_paragraph_features(paragraph)
+        features.append(paragraph_features)
+        uncached += not cached
+    new_share = uncached / max(len(paragraphs), 1)
+    if sum(len(f.sentences) for f in features) <= SUMMARY_SENTENCES:
+        return text[:150] + "...", new_share
+    return " ".join(rank_sentences(features, SUMMARY_SENTENCES)), new_share
+
+def extractive_summary(text: str) -> str:
+    # Легкий путь без модели: им же подменяется недоступный бэкенд
+    return _extract(text)[0]
+
+# Функция суммаризации (экстрактивная: TF-IDF по предложениям)
+def summarize_text(text: str, model_type: str = "default") -> str:
+    summary, new_share = _extract(text)
+    # Имитация обработки новых абзацев моделью; ожидание прерывается сроком запроса
+    sleep_with_deadline(MODEL_LATENCY.get(model_type, SUMMARIZER_LATENCY) * new_share)
+    return summary
+
+# Бэкенд суммаризатора (Settings.summarizer, выбирается в create_app): model или extractive
+_backend = "model"
+
+def set_backend(name: str):
+    global _backend
+    _backend = name
+
+def _call_backend(text: str, model_type: str) -> str:
+    # Спан только у ведущего вызова single-flight: ожидающие считаются в summarizer.summarize
+    with span("summarizer.backend", **{"summarizer.backend": _backend, "summarizer.model": model_type}):
+        if _backend == "extractive":
+            return extractive_summary(text)
+        # Бэкенд модели — через ее bulkhead и circuit breaker (app.services.resilience)
+        return get_guard(model_type).call(summarize_text, text, model_type)
+
+# ========== SINGLE-FLIGHT ==========
+# Одинаковые тексты, пришедшие одновременно (например, свежая статья с arXiv),
+# суммаризируются один раз. Оплата при этом списывается с каждого вызывающего.
+def _wait_shared(future):
+    # Ожидающий чужой результат перестает ждать по своему сроку или отмене
+    deadline = current_deadline()
+    if deadline is None:
+        return future.result()
+    while True:
+        try:
+            return future.result(timeout=min(deadline.remaining(), 0.1))
+        except FutureTimeout:
+            deadline.check()
+
+_inflight = SingleFlight(wait=_wait_shared)
+
+def input_key(text: str, model_type: str = "default"):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest(), model_type
+
+def summarize_coalesced(text: str, model_type: str = "default"):
+    # Возвращает (summary, shared). Если общий вызов прервался по сроку чужого запроса,
+    # а у нашего срок еще есть, считаем заново (абзацы уже в кэше признаков)
+    while True:
+        try:
+            return _inflight.do(input_key(text, model_type), _call_backend, text, model_type)
+        except RequestAborted:
+            deadline = current_deadline()
+            if deadline is not None and deadline.aborted():
+                raise
+
+def in_flight() -> int:
+    return _inflight.in_flight()
+
+def drain(timeout: float = None) -> bool:
+    # Дожидаемся текущих суммаризаций при штатной остановке воркера
+    return _inflight.wait_idle(timeout)
+
+def result_hash(input_hash: str, model_type: str, summary: str) -> str:
+    # Хэш сохраненного результата: не меняется, пока не меняется сама запись
+    return hashlib.sha256(f"{input_hash}:{model_type}:{summary}".encode("utf-8")).hexdigest()
@@ -0,0 +1,118 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+# Признаки считаются по абзацам и кэшируются по хэшу абзаца: при повторной отправке
+# отредактированного черновика заново обрабатываются только измененные абзацы.
+# Кэш на воркер ограничен приблизительным объемом в байтах (признаки абзаца занимают
+# в памяти ~20-25 байт на символ текста) и числом записей
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("FEATURE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "20000"))
+# Оценка размера записи: строки предложений, элементы словарей TF/DF, сам объект и ключ
+_ENTRY_OVERHEAD = 400
+_TEXT_BYTES_PER_CHAR = 2
+_TERM_BYTES = 64
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MIN_TOKEN_LENGTH = 3
+
+@dataclass(frozen=True)
+class ParagraphFeatures:
+    sentences: Tuple[str, ...]
+    token_counts: Tuple[int, ...]
+    # Частоты терминов по предложениям (TF) и число предложений с термином (вклад абзаца в DF)
+    term_freqs: Tuple[Dict[str, int], ...]
+    doc_freqs: Dict[str, int]
+
+def split_paragraphs(text: str):
+    return [p.strip() for p in _PARAGRAPH_RE.split(text) if p.strip()]
+
+def paragraph_key(paragraph: str) -> str:
+    return hashlib.sha1(paragraph.encode("utf-8")).hexdigest()
+
+def extract_features(paragraph: str) -> ParagraphFeatures:
+    sentences = tuple(s.strip() for s in _SENTENCE_RE.split(paragraph) if s.strip())
+    token_counts = []
+    term_freqs = []
+    doc_freqs = Counter()
+    for sentence in sentences:
+        tokens = [t for t in _TOKEN_RE.findall(sentence.lower()) if len(t) >= MIN_TOKEN_LENGTH]
+        tf = Counter(tokens)
+        token_counts.append(len(tokens))
+        term_freqs.append(dict(tf))
+        doc_freqs.update(tf.keys())
+    return ParagraphFeatures(sentences, tuple(token_counts), tuple(term_freqs), dict(doc_freqs))
+
+def approximate_size(paragraph: str, features: ParagraphFeatures) -> int:
+    terms = sum(len(tf) for tf in features.term_freqs) + len(features.doc_freqs)
+    return _ENTRY_OVERHEAD + _TEXT_BYTES_PER_CHAR * len(paragraph) + _TERM_BYTES * terms
+
+# ========== КЭШ ПРИЗНАКОВ ==========
+# key -> (features, приблизительный размер в байтах)
+_feature_cache = OrderedDict()
+_feature_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bytes": 0}
+
+def get_paragraph_features(paragraph: str):
+    # Возвращает (features, cached)
+    key = paragraph_key(paragraph)
+    with _feature_lock:
+        entry = _feature_cache.get(key)
+        if entry is not None:
+            _feature_cache.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[0], True
+    features = extract_features(paragraph)
+    size = approximate_size(paragraph, features)
+    with _feature_lock:
+        _stats["misses"] += 1
+        if size > FEATURE_CACHE_MAX_BYTES:
+            return features, False
+        previous = _feature_cache.pop(key, None)
+        if previous is not None:
+            _stats["bytes"] -= previous[1]
+        _feature_cache[key] = (features, size)
+        _stats["bytes"] += size
+        while _stats["bytes"] > FEATURE_CACHE_MAX_BYTES or len(_feature_cache) > FEATURE_CACHE_SIZE:
+            _, (_, evicted) = _feature_cache.popitem(last=False)
+            _stats["bytes"] -= evicted
+    return features, False
+
+def cache_stats() -> dict:
+    with _feature_lock:
+        return {"size": len(_feature_cache), **_stats}
+
+def clear_cache():
+    with _feature_lock:
+        _feature_cache.clear()
+        _stats["hits"] = _stats["misses"] = _stats["bytes"] = 0
+
+# ========== ОЦЕНКА ПРЕДЛОЖЕНИЙ ==========
+def rank_sentences(features, limit: int):
+    # IDF по предложениям всего документа собирается из закэшированных DF абзацев,
+    # поэтому пересчет оценок после правки не требует повторной токенизации
+    doc_freqs = Counter()
+    total = 0
+    for paragraph in features:
+        doc_freqs.update(paragraph.doc_freqs)
+        total += len(paragraph.sentences)
+    idf = {term: math.log((1 + total) / (1 + df)) + 1.0 for term, df in doc_freqs.items()}
+
+    scored = []
+    for p_index, paragraph in enumerate(features):
+        for s_index, (tf, count) in enumerate(zip(paragraph.term_freqs, paragraph.token_counts)):
+            if count == 0:
+                continue
+            # Нормировка на корень длины: короткие предложения не выигрывают только за счет редких слов
+            score = sum(freq * idf[term] for term, freq in tf.items()) / math.sqrt(count)
+            scored.append((score, p_index, s_index))
+    top = sorted(scored, key=lambda item: -item[0])[:limit]
+    # В резюме предложения идут в порядке текста
+    return [features[p].sentences[s] for _, p, s in sorted(top, key=lambda item: (item[1], item[2]))]
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import zlib
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.prediction_input import PredictionInput
+
+try:
+    import zstandard
+except ImportError:  # zstd опционален, без него используется zlib
+    zstandard = None
+
+# INPUT_CODEC=zstd|zlib — кодек для новых записей (старые читаются по своему кодеку)
+INPUT_CODEC = os.getenv("INPUT_CODEC", "zstd" if zstandard is not None else "zlib")
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+ZLIB_LEVEL = int(os.getenv("ZLIB_LEVEL", "6"))
+PREVIEW_LENGTH = 200
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_preview(text: str) -> str:
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    return text[:PREVIEW_LENGTH - 3] + "..."
+
+def compress_text(text: str, codec: str = None):
+    codec = codec or INPUT_CODEC
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return codec, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, ZLIB_LEVEL)
+
+def decompress_text(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed, cannot read zstd input")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+def store_input(db: Session, text: str, text_hash: str = None) -> str:
+    # Сохраняет текст, если такого содержимого еще нет; возвращает хэш. Коммит — на вызывающем
+    text_hash = text_hash or content_hash(text)
+    if db.get(PredictionInput, text_hash) is not None:
+        return text_hash
+    codec, data = compress_text(text)
+    try:
+        with db.begin_nested():
+            db.add(PredictionInput(content_hash=text_hash, codec=codec, data=data, size=len(text)))
+    except IntegrityError:
+        # Тот же текст только что сохранил параллельный запрос
+        pass
+    return text_hash
+
+def load_input(db: Session, text_hash: str):
+    stored = db.get(PredictionInput, text_hash)
+    if stored is None:
+        return None
+    return decompress_text(stored.codec, stored.data)
+
+def load_inputs(db: Session, hashes) -> dict:
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+    rows = db.query(PredictionInput.content_hash, PredictionInput.codec, PredictionInput.data).filter(
+        PredictionInput.content_hash.in_(hashes)
+    ).all()
+    return {h: decompress_text(codec, data) for h, codec, data in rows}
@@ -0,0 +1,341 @@
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.services.batch_writer import BatchFileHandler, BatchWriter
+
+# Трассировка запросов по стадиям (JWT, пользователь, запросы к БД, резерв и списание,
+# модель). Модель данных OpenTelemetry: trace/span id, родитель, атрибуты, статус; контекст
+# вызывающего приходит в заголовке W3C traceparent, файл пишется в формате OTLP/JSON
+# (по строке ExportTraceServiceRequest на пачку, читается receiver'ом otlpjsonfile коллектора).
+# Решение о сэмплировании принимается один раз на запрос (middleware). Вне сэмплированного
+# запроса span() возвращает общий пустой объект: цена — чтение contextvar.
+TRACING = os.getenv("TRACING", "off") == "on"
+# Доля трассируемых запросов; запрос с traceparent следует решению вызывающего
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "0.01"))
+# file — OTLP/JSON в TRACING_PATH ({pid} — файл на воркер), memory — в памяти процесса (проверки)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "file")
+TRACING_PATH = os.getenv("TRACING_PATH", "./data/traces/spans-{pid}.jsonl")
+TRACING_MAX_BYTES = int(os.getenv("TRACING_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACING_BACKUP_COUNT = int(os.getenv("TRACING_BACKUP_COUNT", "5"))
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "10000"))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "sci-summ-api")
+TRACEPARENT_HEADER = "traceparent"
+# Текст SQL в атрибуте db.statement обрезается
+DB_STATEMENT_LIMIT = 500
+
+# Коды OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_ERROR = 2
+
+_current_span = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "attributes",
+                 "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, e: BaseException):
+        self.error = f"{type(e).__name__}: {e}"
+        self.attributes["exception.type"] = type(e).__name__
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+
+    def child(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: dict = None) -> "Span":
+        return Span(name, self.trace_id, self.span_id, kind, attributes)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return span
+
+
+class _NoopSpan:
+    # Спан вне сэмплированного запроса: ничего не записывает и не меняет контекст
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def record_exception(self, e: BaseException):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def span(name: str, **attributes):
+    # Дочерний спан текущего; без сэмплированного запроса — пустой объект
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    return parent.child(name, attributes=attributes)
+
+
+def parse_traceparent(header: Optional[str]):
+    # (trace_id, parent_id, sampled) или None, если заголовка нет или он некорректен
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    trace_id, parent_id, flags = parts[1].lower(), parts[2].lower(), parts[3]
+    try:
+        if len(trace_id) != 32 or len(parent_id) != 16 or int(trace_id, 16) == 0 or int(parent_id, 16) == 0:
+            return None
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    return trace_id, parent_id, sampled
+
+
+def start_trace(name: str, traceparent: Optional[str], sample_rate: float, **attributes) -> Optional[Span]:
+    # Корневой (серверный) спан запроса или None, если запрос не трассируется
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+        if not sampled:
+            return None
+    elif random.random() < sample_rate:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+    else:
+        return None
+    return Span(name, trace_id, parent_id, SPAN_KIND_SERVER, attributes)
+
+
+# ========== ЭКСПОРТ ==========
+class InMemorySpanExporter:
+    # Коллектор в памяти процесса: для проверок и бенчмарков
+    def __init__(self):
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        with self._lock:
+            self._spans.append(finished)
+
+    def get_finished_spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"exporter": "memory", "spans": len(self._spans)}
+
+
+class _OtlpFileHandler(BatchFileHandler):
+    # Пачка спанов — одна строка ExportTraceServiceRequest
+    def format_batch(self, spans) -> str:
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "sci_summ"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+        return orjson.dumps(request).decode("utf-8") + "\n"
+
+
+class FileSpanExporter:
+    # Законченные спаны уходят в очередь, OTLP/JSON пишется фоновым потоком пачками
+    def __init__(self, path: str = None):
+        path = (path or TRACING_PATH).format(pid=os.getpid())
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._writer = BatchWriter(_OtlpFileHandler(
+            path, maxBytes=TRACING_MAX_BYTES, backupCount=TRACING_BACKUP_COUNT, encoding="utf-8"
+        ), TRACING_QUEUE_SIZE, "trace-export")
+        self._writer.start()
+
+    def export(self, finished: Span):
+        self._writer.put(finished)
+
+    def shutdown(self, timeout: float = 5.0):
+        self._writer.close(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "exporter": "file",
+            "queued": self._writer.queue.qsize(),
+            "written": self._writer.written,
+            "dropped": self._writer.dropped,
+        }
+
+
+_exporter = None
+
+
+# ========== SQL ==========
+# Спан на каждый запрос к БД внутри сэмплированного запроса (оба пула: основной и для чтения);
+# родитель — текущая стадия (например, billing.hold)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None or context is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    context._trace_span = parent.child(f"db.{operation.lower()}", SPAN_KIND_CLIENT, {
+        "db.system": conn.dialect.name,
+        "db.operation": operation,
+        "db.statement": statement[:DB_STATEMENT_LIMIT],
+    })
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    db_span = getattr(context, "_trace_span", None)
+    if db_span is not None:
+        context._trace_span = None
+        db_span.end()
+
+
+def _handle_error(exception_context):
+    db_span = getattr(exception_context.execution_context, "_trace_span", None)
+    if db_span is not None:
+        exception_context.execution_context._trace_span = None
+        db_span.record_exception(exception_context.original_exception)
+        db_span.end()
+
+
+# Коммит сессии (flush и COMMIT) — отдельный спан db.commit
+def _before_commit(session):
+    parent = _current_span.get()
+    if parent is not None:
+        session.info["trace_commit"] = parent.child("db.commit", SPAN_KIND_CLIENT)
+
+
+def _after_commit(session):
+    commit_span = session.info.pop("trace_commit", None)
+    if commit_span is not None:
+        commit_span.end()
+
+
+def _after_rollback(session):
+    # Коммит не удался (или откат без коммита — тогда спана нет)
+    commit_span = session.info.pop("trace_commit", None)
+    if commit_span is not None:
+        commit_span.error = "Rolled back"
+        commit_span.end()
+
+
+_HOOKS = (
+    (Engine, "before_cursor_execute", _before_cursor_execute),
+    (Engine, "after_cursor_execute", _after_cursor_execute),
+    (Engine, "handle_error", _handle_error),
+    (Session, "before_commit", _before_commit),
+    (Session, "after_commit", _after_commit),
+    (Session, "after_rollback", _after_rollback),
+)
+
+
+def start(exporter=None):
+    # Запускается в каждом воркере после fork (lifespan). Без явного экспортера —
+    # по TRACING_EXPORTER
+    global _exporter
+    if _exporter is not None:
+        return
+    if exporter is None:
+        exporter = InMemorySpanExporter() if TRACING_EXPORTER == "memory" else FileSpanExporter()
+    _exporter = exporter
+    # Хуки SQLAlchemy ставятся только при включенной трассировке
+    for target, name, hook in _HOOKS:
+        if not event.contains(target, name, hook):
+            event.listen(target, name, hook)
+
+
+def stop():
+    global _exporter
+    if _exporter is None:
+        return
+    for target, name, hook in _HOOKS:
+        if event.contains(target, name, hook):
+            event.remove(target, name, hook)
+    exporter, _exporter = _exporter, None
+    exporter.shutdown()
+
+
+def get_exporter():
+    return _exporter
+
+
+def stats() -> dict:
+    exporter = _exporter
+    if exporter is None:
+        return {"enabled": False}
+    return {"enabled": True, **exporter.stats()}
@@ -0,0 +1,273 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.account import Account
+from app.models.prediction import Prediction
+from app.models.prediction_input import PredictionInput
+from app.models.transaction import Transaction
+from app.models.usage_rollup import LedgerRollup, UsageRollup, RollupState
+
+# Использование (вызовы, символы, выручка, время модели) по пользователям и моделям и
+# движение средств (сумма и число операций) по пользователям и типам операций.
+# Сырые предсказания и журнал операций читаются один раз: фоновая задача переносит новые строки
+# в почасовые и суточные rollup-таблицы, отчеты читают только их.
+ROLLUP_NAME = "predictions"
+LEDGER_ROLLUP_NAME = "transactions"
+PERIODS = ("hour", "day")
+GROUP_COLUMNS = {
+    "bucket": UsageRollup.bucket_start,
+    "user": UsageRollup.user_id,
+    "model": UsageRollup.model_used,
+}
+LEDGER_GROUP_COLUMNS = {
+    "bucket": LedgerRollup.bucket_start,
+    "user": LedgerRollup.user_id,
+    "type": LedgerRollup.type,
+}
+ROLLUP_CHUNK_SIZE = int(os.getenv("ROLLUP_CHUNK_SIZE", "5000"))
+# Свежие строки учитываются с задержкой: строка с меньшим id может зафиксироваться позже большей
+ROLLUP_LAG = float(os.getenv("ROLLUP_LAG", "5"))
+DEFAULT_RANGE = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+
+def _utc_naive(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def bucket_start(dt: datetime, period: str) -> datetime:
+    dt = _utc_naive(dt).replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0) if period == "day" else dt
+
+
+USAGE_KEYS = ("period", "bucket_start", "user_id", "model_used")
+USAGE_VALUES = ("calls", "chars", "revenue", "processing_time")
+LEDGER_KEYS = ("period", "bucket_start", "user_id", "type")
+LEDGER_VALUES = ("entries", "amount")
+
+
+def _upsert(db: Session, table, keys, values, rows):
+    # Прибавляем к существующим счетчикам интервала: INSERT ... ON CONFLICT DO UPDATE,
+    # одна скомпилированная команда на все строки (executemany). Модуль диалекта загружается
+    # при первом rollup, а не при импорте приложения
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # Прочие СУБД: UPDATE с прибавлением, новый интервал — INSERT. Одновременный INSERT
+        # того же интервала другим воркером упирается в уникальный ключ (см. _apply)
+        for row in rows:
+            result = db.execute(
+                update(table)
+                .where(*(table.c[key] == row[key] for key in keys))
+                .values({name: table.c[name] + row[name] for name in values})
+            )
+            if result.rowcount == 0:
+                db.execute(table.insert().values(row))
+        return
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: table.c[name] + stmt.excluded[name] for name in values},
+    )
+    db.execute(stmt, rows)
+
+
+def _get_watermark(db: Session, name: str) -> int:
+    state = db.get(RollupState, name)
+    if state is not None:
+        return state.last_id
+    try:
+        with db.begin_nested():
+            db.add(RollupState(name=name, last_id=0))
+    except IntegrityError:
+        pass  # создал параллельный воркер
+    db.commit()
+    return db.get(RollupState, name).last_id
+
+
+def _apply(db: Session, name: str, last_id: int, new_last_id: int, table, keys, values, totals) -> bool:
+    # rollup и новая отметка одной транзакцией. Отметка сдвигается условным UPDATE: если
+    # параллельный воркер успел раньше, все откатывается и строки не учитываются дважды
+    try:
+        _upsert(db, table, keys, values, [dict(zip(keys + values, key + tuple(total))) for key, total in totals.items()])
+    except IntegrityError:
+        db.rollback()
+        return False
+    result = db.execute(
+        update(RollupState)
+        .where(RollupState.name == name, RollupState.last_id == last_id)
+        .values(last_id=new_last_id, updated_at=func.now())
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+
+def _rollup_predictions_chunk(db: Session) -> int:
+    # Один шаг: следующие ROLLUP_CHUNK_SIZE предсказаний после отметки
+    last_id = _get_watermark(db, ROLLUP_NAME)
+    rows = (
+        db.query(
+            Prediction.id, Prediction.user_id, Prediction.model_used, Prediction.cost,
+            Prediction.processing_time, Prediction.created_at, PredictionInput.size,
+        )
+        .outerjoin(PredictionInput, PredictionInput.content_hash == Prediction.input_hash)
+        .filter(Prediction.id > last_id)
+        .order_by(Prediction.id)
+        .limit(ROLLUP_CHUNK_SIZE)
+        .all()
+    )
+    cutoff = datetime.utcnow() - timedelta(seconds=ROLLUP_LAG)
+    totals = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    new_last_id = last_id
+    count = 0
+    for prediction_id, user_id, model_used, cost, processing_time, created_at, size in rows:
+        if _utc_naive(created_at) > cutoff:
+            break
+        for period in PERIODS:
+            total = totals[(period, bucket_start(created_at, period), user_id, model_used)]
+            total[0] += 1
+            total[1] += size or 0
+            total[2] += cost
+            total[3] += processing_time
+        new_last_id = prediction_id
+        count += 1
+    if not count:
+        return 0
+    if not _apply(db, ROLLUP_NAME, last_id, new_last_id, UsageRollup.__table__, USAGE_KEYS, USAGE_VALUES, totals):
+        return 0
+    return count
+
+
+def _rollup_ledger_chunk(db: Session) -> int:
+    # То же для журнала операций: сумма и число операций по пользователю и типу
+    last_id = _get_watermark(db, LEDGER_ROLLUP_NAME)
+    rows = (
+        db.query(Transaction.id, Account.user_id, Transaction.type, Transaction.amount, Transaction.created_at)
+        .join(Account, Account.id == Transaction.account_id)
+        .filter(Transaction.id > last_id)
+        .order_by(Transaction.id)
+        .limit(ROLLUP_CHUNK_SIZE)
+        .all()
+    )
+    cutoff = datetime.utcnow() - timedelta(seconds=ROLLUP_LAG)
+    totals = defaultdict(lambda: [0, 0.0])
+    new_last_id = last_id
+    count = 0
+    for transaction_id, user_id, transaction_type, amount, created_at in rows:
+        if _utc_naive(created_at) > cutoff:
+            break
+        for period in PERIODS:
+            total = totals[(period, bucket_start(created_at, period), user_id, transaction_type)]
+            total[0] += 1
+            total[1] += amount
+        new_last_id = transaction_id
+        count += 1
+    if not count:
+        return 0
+    if not _apply(db, LEDGER_ROLLUP_NAME, last_id, new_last_id, LedgerRollup.__table__, LEDGER_KEYS, LEDGER_VALUES, totals):
+        return 0
+    return count
+
+
+def refresh_usage_rollups(db: Session) -> int:
+    # Переносит в rollup все накопившиеся предсказания и операции по счетам; возвращает их число
+    processed = 0
+    for rollup_chunk in (_rollup_predictions_chunk, _rollup_ledger_chunk):
+        while True:
+            count = rollup_chunk(db)
+            processed += count
+            if count < ROLLUP_CHUNK_SIZE:
+                break
+    return processed
+
+
+def rollup_status(db: Session, name: str = ROLLUP_NAME) -> dict:
+    state = db.get(RollupState, name)
+    if state is None:
+        return {"last_id": 0, "updated_at": None}
+    return {"last_id": state.last_id, "updated_at": state.updated_at}
+
+
+def _report(db: Session, model, group_columns: dict, sums, period: str, start: datetime, end: datetime,
+            group_by: str, filters, limit: int):
+    # Общая часть отчетов: проверка group_by и периода, суммы rollup-строк по группам.
+    # Возвращает (имена полей группировки, строки)
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}', expected one of: {', '.join(PERIODS)}")
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in group_columns]
+    if unknown or not groups:
+        raise ValueError(f"Invalid group_by '{group_by}', expected a subset of: {', '.join(group_columns)}")
+    end = _utc_naive(end) if end else datetime.utcnow()
+    start = _utc_naive(start) if start else end - DEFAULT_RANGE[period]
+
+    columns = [group_columns[g] for g in groups]
+    query = (
+        db.query(*columns, *(func.sum(column) for column in sums))
+        .filter(
+            model.period == period,
+            model.bucket_start >= bucket_start(start, period),
+            model.bucket_start < end,
+            *filters,
+        )
+    )
+    rows = query.group_by(*columns).order_by(*columns).limit(limit).all()
+    return [group_columns[g].key for g in groups], rows
+
+
+def usage_report(db: Session, period: str = "day", start: datetime = None, end: datetime = None,
+                 group_by: str = "bucket", user_id: int = None, model: str = None, limit: int = 1000):
+    # group_by — через запятую из bucket, user, model. Читаются только rollup-строки интервалов
+    filters = []
+    if user_id is not None:
+        filters.append(UsageRollup.user_id == user_id)
+    if model is not None:
+        filters.append(UsageRollup.model_used == model)
+    names, rows = _report(
+        db, UsageRollup, GROUP_COLUMNS,
+        (UsageRollup.calls, UsageRollup.chars, UsageRollup.revenue, UsageRollup.processing_time),
+        period, start, end, group_by, filters, limit,
+    )
+    report = []
+    for row in rows:
+        calls, chars, revenue, processing_time = row[len(names):]
+        item = dict(zip(names, row[:len(names)]))
+        item.update(
+            calls=calls, chars=chars, revenue=round(revenue, 4),
+            mean_latency=round(processing_time / calls, 4) if calls else 0.0,
+        )
+        report.append(item)
+    return report
+
+
+def ledger_report(db: Session, period: str = "day", start: datetime = None, end: datetime = None,
+                  group_by: str = "bucket", user_id: int = None, type: str = None, limit: int = 1000):
+    # group_by — через запятую из bucket, user, type
+    filters = []
+    if user_id is not None:
+        filters.append(LedgerRollup.user_id == user_id)
+    if type is not None:
+        filters.append(LedgerRollup.type == type)
+    names, rows = _report(
+        db, LedgerRollup, LEDGER_GROUP_COLUMNS, (LedgerRollup.entries, LedgerRollup.amount),
+        period, start, end, group_by, filters, limit,
+    )
+    report = []
+    for row in rows:
+        entries, amount = row[len(names):]
+        item = dict(zip(names, row[:len(names)]))
+        item.update(entries=entries, amount=round(amount, 4))
+        report.append(item)
+    return report
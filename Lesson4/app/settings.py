@@ -0,0 +1,38 @@
+import os
+from dataclasses import dataclass
+
+from app.services.access_log import ACCESS_LOG
+from app.services.maintenance import MAINTENANCE_INTERVAL
+from app.services.tracing import TRACING, TRACING_SAMPLE_RATE
+
+# Конфигурация, из которой create_app (app/api.py) собирает приложение. Значения по
+# умолчанию берутся из окружения при импорте, как и остальные настройки проекта;
+# для бенчмарков и проверок отдельные поля меняются через dataclasses.replace.
+SUMMARIZER_BACKENDS = ("model", "extractive")
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Суммаризатор: model — модели через bulkhead и circuit breaker,
+    # extractive — только экстрактивная суммаризация без вызова модели
+    summarizer: str = os.getenv("SUMMARIZER_BACKEND", "model")
+    # Загрузка моделей при старте приложения; gunicorn.conf.py выключает ее по умолчанию,
+    # там модели загружает мастер до fork
+    preload_models: bool = os.getenv("PRELOAD_MODELS", "1") == "1"
+    # БД: чтения с реплики / read-only пула (off — все запросы в основную БД)
+    read_replica: bool = os.getenv("READ_REPLICA", "on") == "on"
+    # Схема создается миграцией (python -m app.database.migrate), а не при каждом старте;
+    # AUTO_CREATE_SCHEMA=1 оставлен для локальной разработки
+    auto_create_schema: bool = os.getenv("AUTO_CREATE_SCHEMA", "0") == "1"
+    # Слои ответа: сжатие и фоновый access-лог
+    compression: bool = os.getenv("COMPRESSION", "on") == "on"
+    access_log: bool = ACCESS_LOG
+    # Трассировка стадий запроса (app.services.tracing) и доля трассируемых запросов
+    tracing: bool = TRACING
+    trace_sample_rate: float = TRACING_SAMPLE_RATE
+    maintenance_interval: float = MAINTENANCE_INTERVAL  # 0 — без фоновой задачи
+    shutdown_drain_timeout: float = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+
+    def __post_init__(self):
+        if self.summarizer not in SUMMARIZER_BACKENDS:
+            raise ValueError(f"summarizer must be one of: {', '.join(SUMMARIZER_BACKENDS)}")
@@ -0,0 +1,75 @@
+# Стоимость строки access-лога в обработчике запроса: синхронная запись JSON в поток
+# (как logging.StreamHandler в stdout) против очереди с фоновой пакетной записью (app.services.access_log)
+# python benchmarks/access_log.py [--records 100000] [--sample-rate 1.0]
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIELDS = {"user_id": 42, "model": "default", "cost": 0.5168, "summarizer_ms": 1012.4, "cache_hit": None}
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg)
+
+
+def sync_logger(path):
+    logger = logging.getLogger("bench.sync")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(open(path, "w", encoding="utf-8"))
+    handler.setFormatter(_JsonFormatter())
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--sample-rate", type=float, default=1.0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["ACCESS_LOG_SAMPLE_RATE"] = str(args.sample_rate)
+    os.environ["ACCESS_LOG_QUEUE_SIZE"] = str(args.records + 1)
+
+    from app.services import access_log
+
+    logger, handler = sync_logger(os.path.join(tmp, "sync.log"))
+    start = time.perf_counter()
+    for i in range(args.records):
+        logger.info({
+            "type": "access", "ts": time.time(), "method": "POST", "path": "/predictions/summarize",
+            "route": "/predictions/summarize", "status": 200, "latency_ms": 1020.5, **FIELDS,
+        })
+        handler.flush()
+    sync_time = time.perf_counter() - start
+    handler.close()
+
+    path = os.path.join(tmp, "access.log")
+    access_log.start(path)
+    start = time.perf_counter()
+    for i in range(args.records):
+        access_log.log_request("POST", "/predictions/summarize", "/predictions/summarize", 200, 1.0205, dict(FIELDS))
+    queued_time = time.perf_counter() - start
+    access_log.stop()
+    drain_time = time.perf_counter() - start
+    with open(path, encoding="utf-8") as f:
+        written = sum(1 for _ in f)
+
+    print(f"{args.records} records, sample rate {args.sample_rate}")
+    print(f"  sync JSON + flush per record:    {sync_time / args.records * 1e6:6.1f} us/request")
+    print(f"  queued write (request path):     {queued_time / args.records * 1e6:6.1f} us/request")
+    print(f"  background batched writes:       {drain_time:6.2f} s total, {written} lines written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# Медленная тяжелая модель не должна тормозить default и остальные эндпоинты:
+# bulkhead ограничивает ее слоты, breaker после серии медленных вызовов переключает
+# ее на экстрактивную подмену
+# python benchmarks/bulkhead.py [--large 60] [--large-latency 5] [--no-isolation]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def article(tag, i):
+    return (
+        f"Study {tag} {i} introduces a method. The method {tag} {i} is evaluated on benchmarks. "
+        f"Results {tag} {i} improve on strong baselines. Ablations {tag} {i} confirm each component."
+    )
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return f"p50 {statistics.median(latencies) * 1000:7.0f} ms, max {latencies[-1] * 1000:7.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--large", type=int, default=60, help="concurrent requests to the slow model")
+    parser.add_argument("--large-latency", type=float, default=5.0)
+    parser.add_argument("--probes", type=int, default=10)
+    parser.add_argument("--no-isolation", action="store_true", help="disable bulkhead and breaker limits")
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте, поэтому задаются до импорта приложения
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NEAR_DUP_INDEX_PATH"] = os.path.join(tmp, "near_dup.idx")
+    os.environ["MAINTENANCE_INTERVAL"] = "0"
+    os.environ["SUMMARIZER_LATENCY"] = "0.2"
+    os.environ["SUMMARIZER_LATENCY_LARGE"] = str(args.large_latency)
+    os.environ["BREAKER_SLOW_CALL"] = str(args.large_latency / 2)
+    os.environ["BREAKER_MIN_CALLS"] = "4"
+    if args.no_isolation:
+        os.environ["BULKHEAD_SIZE_LARGE"] = "100000"
+        os.environ["BREAKER_MIN_CALLS"] = "100000"
+
+    from fastapi.testclient import TestClient
+
+    from app.api import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "bench"})
+        token = client.post("/auth/login", data={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        client.post("/accounts/deposit", params={"amount": 100000}, headers=headers)
+
+        def large(i):
+            response = client.post(
+                "/predictions/summarize", json={"text": article("large", i), "model_type": "large"}, headers=headers
+            )
+            return response.json().get("model_used", response.status_code)
+
+        def timed(fn):
+            start = time.perf_counter()
+            fn()
+            return time.perf_counter() - start
+
+        def probe_default(i):
+            return timed(lambda: client.post(
+                "/predictions/summarize", json={"text": article("default", i)}, headers=headers
+            ))
+
+        def probe_balance(_):
+            return timed(lambda: client.get("/accounts/balance", headers=headers))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.large) as large_pool:
+            outcomes = large_pool.map(large, range(args.large))
+            time.sleep(0.5)  # тяжелые запросы уже заняли свои слоты
+            with ThreadPoolExecutor(max_workers=args.probes) as probe_pool:
+                default_latencies = list(probe_pool.map(probe_default, range(args.probes)))
+                balance_latencies = list(probe_pool.map(probe_balance, range(args.probes)))
+            outcomes = Counter(outcomes)
+        elapsed = time.perf_counter() - start
+        metrics = client.get("/metrics").json()["backends"]
+
+    mode = "no isolation" if args.no_isolation else "bulkhead + breaker"
+    print(f"{mode}: {args.large} concurrent 'large' requests at {args.large_latency} s each")
+    print(f"  default summarize during overload:  {summary(default_latencies)}")
+    print(f"  /accounts/balance during overload:  {summary(balance_latencies)}")
+    print(f"  large outcomes: {dict(outcomes)} in {elapsed:.1f} s")
+    large_stats = metrics.get("large", {})
+    if large_stats:
+        print(f"  large breaker: {large_stats['breaker']['state']}, opened {large_stats['breaker']['opened']}, "
+              f"bulkhead rejected {large_stats['bulkhead']['rejected']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# Экономия трафика и стоимость CPU при сжатии типичных ответов API
+# python benchmarks/compression.py
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+from app.middleware.compression import COMPRESSION_MIN_SIZE, _BrotliEncoder, _GzipEncoder, BROTLI_AVAILABLE
+from app.services.text_store import make_preview
+
+WORDS = (
+    "model data results method analysis learning network training performance approach "
+    "proposed dataset accuracy neural experiments baseline features evaluation task tasks "
+    "we show that our significantly improves state of the art on benchmark using"
+).split()
+
+
+def fake_text(rng, sentences):
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def make_payloads():
+    rng = random.Random(42)
+    balance = orjson.dumps({"balance": 42.0, "credit_limit": 100.0})
+
+    def item(i, full):
+        text = fake_text(rng, 150)
+        return {
+            "id": i, "user_id": 1, "input_text": text if full else None,
+            "input_preview": make_preview(text), "summary": fake_text(rng, 3),
+            "model_used": "default", "cost": 1.0, "processing_time": 1.0,
+            "created_at": datetime(2026, 1, 1, 12, 0, i % 60),
+        }
+
+    history = orjson.dumps([item(i, False) for i in range(20)])
+    history_full = orjson.dumps([item(i, True) for i in range(20)])
+    return [("balance", balance), ("history (previews)", history), ("history (include_input)", history_full)]
+
+
+def encode(encoder, body):
+    return encoder.compress(body) + encoder.finish()
+
+
+def main():
+    encoders = [("gzip 1", lambda: _GzipEncoder(1)), ("gzip 4", lambda: _GzipEncoder(4)),
+                ("gzip 6", lambda: _GzipEncoder(6)),
+                ("gzip 9", lambda: _GzipEncoder(9))]
+    if BROTLI_AVAILABLE:
+        encoders += [("br 1", lambda: _BrotliEncoder(1)), ("br 4", lambda: _BrotliEncoder(4)),
+                     ("br 6", lambda: _BrotliEncoder(6))]
+    else:
+        print("brotli is not installed, only gzip is measured")
+
+    for name, body in make_payloads():
+        print(f"{name}: {len(body)} bytes", end="")
+        if len(body) < COMPRESSION_MIN_SIZE:
+            print(f" — below COMPRESSION_MIN_SIZE={COMPRESSION_MIN_SIZE}, sent uncompressed")
+            continue
+        print()
+        for enc_name, factory in encoders:
+            size = len(encode(factory(), body))
+            seconds = min(timeit.repeat(lambda: encode(factory(), body), number=5, repeat=5)) / 5
+            print(f"  {enc_name:<7} {size:8d} bytes  saved {100 * (1 - size / len(body)):5.1f}%  "
+                  f"{seconds * 1000:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
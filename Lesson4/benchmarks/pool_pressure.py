@@ -0,0 +1,62 @@
+# Параллельные суммаризации при маленьком пуле соединений: сессия не должна держать
+# соединение на время работы модели, иначе параллелизм упирается в размер пула
+# python benchmarks/pool_pressure.py [--requests 20] [--pool-size 2]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--pool-timeout", type=float, default=3.0)
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте app.database.config, поэтому задаются до импорта приложения
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = "0"
+    os.environ["DB_POOL_TIMEOUT"] = str(args.pool_timeout)
+    os.environ["NEAR_DUP_INDEX_PATH"] = os.path.join(tmp, "near_dup.idx")
+    os.environ.setdefault("SUMMARIZER_LATENCY", "1.0")
+
+    from fastapi.testclient import TestClient
+
+    from app.api import app
+    from app.database.migrate import upgrade
+
+    upgrade()
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "bench"})
+        token = client.post("/auth/login", data={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        client.post("/accounts/deposit", params={"amount": 1000}, headers=headers)
+
+        def request(i):
+            text = f"Article {i}. It proposes a method. The method is evaluated. Results improve on baselines."
+            return client.post("/predictions/summarize", json={"text": text}, headers=headers).status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.requests) as pool:
+            statuses = list(pool.map(request, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        balance = client.get("/accounts/balance", headers=headers).json()
+
+    ok = statuses.count(200)
+    print(f"{args.requests} concurrent requests, pool_size={args.pool_size}, max_overflow=0, "
+          f"SUMMARIZER_LATENCY={os.environ['SUMMARIZER_LATENCY']}")
+    print(f"  succeeded {ok}/{args.requests} in {elapsed:.2f} s, statuses: {sorted(set(statuses))}")
+    print(f"  balance {balance['balance']}, held {balance['held']}")
+    return 0 if ok == args.requests else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# Воспроизведение записанного трафика против запущенного API с отчетом по эндпоинтам
+# python benchmarks/replay.py traffic.jsonl --base-url http://localhost:8080 [--speed 10] [--username u --password p]
+#
+# Формат лога — JSONL, одна строка на запрос:
+#   {"ts": 1760000000.25, "method": "POST", "path": "/predictions/summarize", "json": {"text": "..."}}
+# ts — unix-время или ISO 8601; необязательные поля: "json", "data" (форма), "headers".
+# Строки без method/path (например, requests.jsonl с задачами в корне репозитория) пропускаются.
+# --speed 1 — исходные интервалы между запросами, 10 — в 10 раз быстрее, 0 — без пауз.
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+# Идентификаторы в пути сводятся к {id}, чтобы /predictions/1 и /predictions/2 попали в одну строку отчета
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{16,})$")
+
+
+def parse_ts(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def endpoint_name(method, path):
+    path = path.split("?", 1)[0]
+    segments = ["{id}" if ID_SEGMENT.match(s) else s for s in path.split("/")]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+def iter_records(path, stats, limit=None):
+    # Лог читается построчно: файл любого размера не загружается в память целиком
+    count = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                stats["skipped"] += 1
+                continue
+            if not isinstance(record, dict) or not record.get("method") or not record.get("path"):
+                stats["skipped"] += 1
+                continue
+            record["ts"] = parse_ts(record.get("ts"))
+            yield record
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = defaultdict(int)
+        self.errors = 0  # 5xx и сетевые ошибки/таймауты
+        self.client_errors = 0  # 4xx
+
+    def add(self, latency, status):
+        self.latencies.append(latency)
+        self.statuses[status] += 1
+        if not isinstance(status, int) or status >= 500:
+            self.errors += 1
+        elif status >= 400:
+            self.client_errors += 1
+
+    def summary(self):
+        values = sorted(self.latencies)
+        count = len(values)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "client_errors": self.client_errors,
+            "mean_ms": 1000 * sum(values) / count if count else 0.0,
+            "p50_ms": 1000 * percentile(values, 50),
+            "p95_ms": 1000 * percentile(values, 95),
+            "p99_ms": 1000 * percentile(values, 99),
+            "max_ms": 1000 * values[-1] if values else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+        }
+
+
+async def authenticate(client, args):
+    if args.token:
+        return {"Authorization": f"Bearer {args.token}"}
+    if args.username:
+        response = await client.post("/auth/login", data={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return {}
+
+
+async def send(client, record, auth_headers, stats, semaphore):
+    headers = {**record.get("headers", {}), **auth_headers}
+    start = time.perf_counter()
+    try:
+        response = await client.request(
+            record["method"], record["path"], json=record.get("json"), data=record.get("data"), headers=headers
+        )
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    finally:
+        semaphore.release()
+    stats[endpoint_name(record["method"], record["path"])].add(time.perf_counter() - start, status)
+
+
+async def replay(args):
+    # Один клиент с пулом keep-alive соединений на весь прогон
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        auth_headers = await authenticate(client, args)
+        stats = defaultdict(EndpointStats)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        tasks = set()
+        lags = []  # насколько позже расписания ушел запрос (упор в --concurrency или медленный клиент)
+        skipped = {"skipped": 0}
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first_ts = None
+
+        for record in iter_records(args.log, skipped, args.limit):
+            if args.speed > 0 and record["ts"] is not None:
+                if first_ts is None:
+                    first_ts = record["ts"]
+                due = started + (record["ts"] - first_ts) / args.speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await semaphore.acquire()
+            if args.speed > 0 and record["ts"] is not None:
+                lags.append(max(0.0, loop.time() - due))
+            task = asyncio.create_task(send(client, record, auth_headers, stats, semaphore))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    return stats, elapsed, sorted(lags), skipped["skipped"]
+
+
+def print_report(stats, elapsed, lags, skipped):
+    total = EndpointStats()
+    header = f"{'endpoint':<40} {'reqs':>6} {'err%':>6} {'4xx':>5} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print("-" * len(header))
+    for name in sorted(stats):
+        s = stats[name].summary()
+        total.latencies += stats[name].latencies
+        total.errors += stats[name].errors
+        total.client_errors += stats[name].client_errors
+        print(f"{name:<40} {s['requests']:>6} {100 * s['error_rate']:>5.1f}% {s['client_errors']:>5} "
+              f"{s['mean_ms']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+    s = total.summary()
+    print("-" * len(header))
+    print(f"{'total':<40} {s['requests']:>6} {100 * s['error_rate']:>5.1f}% {s['client_errors']:>5} "
+          f"{s['mean_ms']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+    print(f"\n{s['requests']} requests in {elapsed:.2f} s ({s['requests'] / elapsed if elapsed else 0:.1f} req/s), "
+          f"skipped log lines: {skipped}")
+    if lags:
+        print(f"dispatch lag: p50 {1000 * percentile(lags, 50):.1f} ms, p99 {1000 * percentile(lags, 99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded API traffic")
+    parser.add_argument("log", help="JSONL request log")
+    parser.add_argument("--base-url", default=os.getenv("API_URL", "http://localhost:8080"))
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = original timing, N = N times faster, 0 = no pauses")
+    parser.add_argument("--concurrency", type=int, default=50, help="max requests in flight / pooled connections")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--token", help="bearer token added to every request")
+    parser.add_argument("--username", help="log in once and use the token for every request")
+    parser.add_argument("--password")
+    parser.add_argument("--report-json", help="also write the per-endpoint report as JSON")
+    args = parser.parse_args()
+
+    stats, elapsed, lags, skipped = asyncio.run(replay(args))
+    print_report(stats, elapsed, lags, skipped)
+    if args.report_json:
+        with open(args.report_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "elapsed_s": elapsed,
+                "skipped": skipped,
+                "endpoints": {name: s.summary() for name, s in sorted(stats.items())},
+            }, f, indent=2)
+    return 0 if stats else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
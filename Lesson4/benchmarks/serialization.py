@@ -0,0 +1,77 @@
+# Стоимость сериализации 1k элементов истории предсказаний (с полным input_text): стандартный путь FastAPI
+# (validate -> dump(mode="json") -> json.dumps) против прямой сериализации строк через orjson
+# python benchmarks/serialization.py [--items 1000] [--text-size 2000]
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.api import PredictionResponse, PREDICTION_FIELDS
+from app.services.serialization import rows_to_dicts
+
+
+def make_data(items, text_size):
+    text = ("Lorem ipsum dolor sit amet. " * (text_size // 28 + 1))[:text_size]
+    objects, rows = [], []
+    for i in range(items):
+        values = dict(
+            id=i, user_id=1, input_text=text, input_preview=text[:200], summary=text[:200], model_used="default",
+            cost=1.0, processing_time=1.0, created_at=datetime(2026, 1, 1, 12, 0, i % 60),
+        )
+        objects.append(SimpleNamespace(**values))
+        rows.append(tuple(values[f] for f in PREDICTION_FIELDS))
+    return objects, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--text-size", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    objects, rows = make_data(args.items, args.text_size)
+    adapter = TypeAdapter(List[PredictionResponse])
+
+    def fastapi_default():
+        # То, что делает FastAPI для response_model + JSONResponse
+        value = adapter.validate_python(objects, from_attributes=True)
+        content = adapter.dump_python(value, mode="json")
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False).encode()
+
+    def orjson_orm():
+        # ORJSONResponse по умолчанию, но с тем же проходом через pydantic
+        value = adapter.validate_python(objects, from_attributes=True)
+        return orjson.dumps(adapter.dump_python(value, mode="json"))
+
+    def orjson_rows():
+        # Горячий путь: строки колонок -> dict -> orjson
+        return orjson.dumps(rows_to_dicts(rows, PREDICTION_FIELDS))
+
+    cases = [
+        ("fastapi default (json)", fastapi_default),
+        ("pydantic + orjson", orjson_orm),
+        ("rows + orjson", orjson_rows),
+    ]
+
+    baseline = None
+    print(f"{args.items} items, input_text {args.text_size} chars")
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        per_1k = best * 1000 / args.items * 1000
+        baseline = baseline or per_1k
+        print(f"  {name:<24} {per_1k:8.2f} ms per 1k items  x{baseline / per_1k:.1f}")
+
+
+if __name__ == "__main__":
+    main()
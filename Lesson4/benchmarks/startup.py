@@ -0,0 +1,198 @@
+# Бенчмарк времени старта: импорт app.api и время до готовности (/ready), затем горячий путь
+# (баланс, история, суммаризация, вход) в приложении из create_app на той же конфигурации
+# python benchmarks/startup.py [--runs 5] [--requests 200]
+# Бюджет задан на накладные расходы приложения сверх голого FastAPI + SQLAlchemy, замеренного
+# тем же способом в том же прогоне: один импорт фреймворков занимает 1.1-1.3 с и сильно зависит
+# от машины, поэтому абсолютный порог то проходил, то нет независимо от кода приложения.
+# Код возврата 1, если превышен бюджет (IMPORT_BUDGET_MS / READY_BUDGET_MS)
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Сверх голого приложения (BARE_APP)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "400"))
+READY_BUDGET_MS = float(os.getenv("READY_BUDGET_MS", "600"))
+
+# Точка отсчета: те же фреймворки и uvicorn без кода приложения
+BARE_MODULE = "bare_app"
+BARE_APP = """
+import sqlalchemy.orm
+from fastapi import FastAPI
+
+app = FastAPI()
+
+
+@app.get("/ready")
+def ready():
+    return {"status": "ready"}
+"""
+
+# Тяжелые зависимости, которые не должны загружаться при импорте приложения
+LAZY_MODULES = ["jose", "passlib", "numpy", "pyarrow", "brotli", "alembic"]
+
+# Конфигурация замеров: передается и в процесс uvicorn, и в Settings горячего пути.
+# Задержка модели выключена — меряется путь запроса, а не имитация модели
+PINNED_ENV = {
+    "SUMMARIZER_BACKEND": "model",
+    "SUMMARIZER_LATENCY": "0",
+    "READ_REPLICA": "on",
+    "COMPRESSION": "on",
+    "ACCESS_LOG": "on",
+    "MAINTENANCE_INTERVAL": "0",
+}
+
+
+def measure_import(env, module):
+    # Время импорта модуля в свежем процессе (мс) и загруженные им тяжелые зависимости
+    code = (
+        "import sys, time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - start) * 1000); print(sorted(sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    lines = out.stdout.strip().splitlines()
+    loaded = eval(lines[-1])
+    leaked = [name for name in LAZY_MODULES if name in loaded]
+    return float(lines[-2]), leaked
+
+
+def measure_ready(env, port, app="app.api:app", app_dir=ROOT):
+    # Время от запуска процесса uvicorn до первого 200 от /ready
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--app-dir", app_dir, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited before becoming ready")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=0.5) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                pass
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return f"p50 {statistics.median(latencies) * 1000:6.2f} ms, p95 {p95 * 1000:6.2f} ms"
+
+
+def measure_hot_path(requests):
+    # В этом же процессе: окружение уже закреплено в main() до импорта приложения
+    sys.path.insert(0, ROOT)
+    from dataclasses import asdict
+
+    from fastapi.testclient import TestClient
+
+    from app.api import create_app
+    from app.database.config import SessionLocal
+    from app.models.user import User
+    from app.services.crud.user import LEGACY_SALT, create_user
+    from app.settings import Settings
+
+    settings = Settings()
+    print(f"settings: {json.dumps(asdict(settings))}")
+
+    # Пользователь со старым хэшем SHA-256: первый вход переводит его в bcrypt
+    with SessionLocal() as db:
+        legacy = create_user(db, {"username": "legacy", "email": "legacy@example.com", "password": "x"})
+        legacy.hashed_password = hashlib.sha256(f"x{LEGACY_SALT}".encode()).hexdigest()
+        db.commit()
+
+    def timed(fn):
+        start = time.perf_counter()
+        response = fn()
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.text
+        return elapsed, response
+
+    with TestClient(create_app(settings)) as client:
+        client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "bench"})
+        login = [timed(lambda: client.post("/auth/login", data={"username": "bench", "password": "bench"}))
+                 for _ in range(5)]
+        headers = {"Authorization": f"Bearer {login[-1][1].json()['access_token']}"}
+        client.post("/accounts/deposit", params={"amount": 100000}, headers=headers)
+        legacy_login, _ = timed(lambda: client.post("/auth/login", data={"username": "legacy", "password": "x"}))
+
+        balance = [timed(lambda: client.get("/accounts/balance", headers=headers))[0] for _ in range(requests)]
+        summarize = [
+            timed(lambda: client.post(
+                "/predictions/summarize",
+                json={"text": f"Paper {i} proposes a method. It is evaluated on data {i}. Results {i} are strong."},
+                headers=headers,
+            ))[0]
+            for i in range(requests)
+        ]
+        history = [timed(lambda: client.get("/predictions/history", headers=headers))[0] for _ in range(requests)]
+
+    with SessionLocal() as db:
+        migrated = db.query(User.hashed_password).filter(User.username == "legacy").scalar()
+    print(f"GET /accounts/balance:       {percentiles(balance)}")
+    print(f"POST /predictions/summarize: {percentiles(summarize)}")
+    print(f"GET /predictions/history:    {percentiles(history)}")
+    print(f"POST /auth/login (bcrypt):   {percentiles([elapsed for elapsed, _ in login])}")
+    print(f"POST /auth/login (legacy):   {legacy_login * 1000:6.2f} ms, "
+          f"hash migrated to bcrypt: {migrated.startswith('$2')}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=200, help="hot path requests per endpoint")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update(PINNED_ENV, DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                      ACCESS_LOG_PATH=os.path.join(tmp, "access.log"),
+                      NEAR_DUP_INDEX_PATH=os.path.join(tmp, "near_dup.idx"))
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-m", "app.database.migrate"], cwd=ROOT, env=env,
+                   check=True, capture_output=True)
+
+    with open(os.path.join(tmp, f"{BARE_MODULE}.py"), "w") as f:
+        f.write(BARE_APP)
+    bare_env = dict(env, PYTHONPATH=tmp)
+
+    # Голое приложение и приложение чередуются, чтобы фон машины влиял на оба замера одинаково
+    imports, bare_imports, ready, bare_ready, leaked = [], [], [], [], []
+    for _ in range(args.runs):
+        bare_imports.append(measure_import(bare_env, BARE_MODULE)[0])
+        ms, leaked = measure_import(env, "app.api")
+        imports.append(ms)
+        bare_ready.append(measure_ready(bare_env, args.port, f"{BARE_MODULE}:app", tmp))
+        ready.append(measure_ready(env, args.port))
+
+    import_ms = statistics.median(imports) - statistics.median(bare_imports)
+    ready_ms = statistics.median(ready) - statistics.median(bare_ready)
+    print(f"import app.api: median {statistics.median(imports):.0f} ms, "
+          f"+{import_ms:.0f} ms over bare app (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"process start -> /ready: median {statistics.median(ready):.0f} ms, "
+          f"+{ready_ms:.0f} ms over bare app (budget {READY_BUDGET_MS:.0f} ms)")
+    if leaked:
+        print(f"eagerly imported heavy modules: {', '.join(leaked)}")
+    measure_hot_path(args.requests)
+
+    ok = import_ms <= IMPORT_BUDGET_MS and ready_ms <= READY_BUDGET_MS and not leaked
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
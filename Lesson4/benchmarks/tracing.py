@@ -0,0 +1,97 @@
+# Цена трассировки: спан вне сэмплированного запроса и путь запроса без трассировки,
+# с трассировкой при нулевом сэмплировании и со всеми запросами в трассе (коллектор в памяти)
+# python benchmarks/tracing.py [--requests 300] [--spans 200000]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def span_cost(count):
+    from app.services import tracing
+
+    start = time.perf_counter()
+    for _ in range(count):
+        with tracing.span("bench.noop", key=1):
+            pass
+    return (time.perf_counter() - start) / count
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return f"p50 {statistics.median(latencies) * 1000:6.2f} ms, p95 {p95 * 1000:6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--spans", type=int, default=200000)
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте, поэтому задаются до импорта приложения
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NEAR_DUP_INDEX_PATH"] = os.path.join(tmp, "near_dup.idx")
+    os.environ["ACCESS_LOG_PATH"] = os.path.join(tmp, "access.log")
+    os.environ["MAINTENANCE_INTERVAL"] = "0"
+    os.environ["SUMMARIZER_LATENCY"] = "0"
+
+    from fastapi.testclient import TestClient
+
+    from app.api import create_app
+    from app.database.migrate import upgrade
+    from app.services import tracing
+    from app.settings import Settings
+
+    upgrade()
+    print(f"span outside a sampled request: {span_cost(args.spans) * 1e6:.2f} us")
+
+    base = Settings(maintenance_interval=0)
+    modes = [
+        ("tracing off", replace(base, tracing=False)),
+        ("tracing on, sample rate 0", replace(base, tracing=True, trace_sample_rate=0.0)),
+        ("tracing on, sample rate 1", replace(base, tracing=True, trace_sample_rate=1.0)),
+    ]
+    exporter = tracing.InMemorySpanExporter()
+    for index, (mode, settings) in enumerate(modes):
+        if settings.tracing:
+            tracing.start(exporter)
+        with TestClient(create_app(settings)) as client:
+            username = f"bench{index}"
+            client.post("/auth/register", json={"username": username, "email": f"{username}@example.com", "password": "bench"})
+            token = client.post("/auth/login", data={"username": username, "password": "bench"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            client.post("/accounts/deposit", params={"amount": 100000}, headers=headers)
+            exporter.clear()
+
+            def timed(fn):
+                start = time.perf_counter()
+                fn()
+                return time.perf_counter() - start
+
+            balance = [timed(lambda: client.get("/accounts/balance", headers=headers)) for _ in range(args.requests)]
+            summarize = [
+                timed(lambda: client.post(
+                    "/predictions/summarize",
+                    json={"text": f"Paper {mode} {i} proposes a method. It is evaluated on data. Results are strong."},
+                    headers=headers,
+                ))
+                for i in range(args.requests)
+            ]
+        spans = len(exporter.get_finished_spans())
+        print(f"{mode}:")
+        print(f"  GET /accounts/balance:       {percentiles(balance)}")
+        print(f"  POST /predictions/summarize: {percentiles(summarize)}")
+        print(f"  spans exported: {spans} ({spans / (2 * args.requests):.1f} per request)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# Отчет об использовании по сырым предсказаниям против rollup-таблиц на многолетней истории
+# python benchmarks/usage_rollup.py [--rows 500000] [--users 50] [--days 730]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=730)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["ROLLUP_LAG"] = "0"
+
+    from sqlalchemy import func, insert
+
+    from app.database.config import SessionLocal
+    from app.database.migrate import upgrade
+    from app.models.prediction import Prediction
+    from app.models.prediction_input import PredictionInput
+    from app.services.usage import refresh_usage_rollups, usage_report
+
+    upgrade()
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    db.execute(insert(PredictionInput), [
+        {"content_hash": f"{i:064x}", "codec": "zlib", "data": b"", "size": rng.randint(500, 50000)}
+        for i in range(1000)
+    ])
+    # Время растет вместе с id, как у настоящих записей
+    ages = sorted((rng.randrange(args.days * 86400) for _ in range(args.rows)), reverse=True)
+    for offset in range(0, args.rows, 50000):
+        db.execute(insert(Prediction), [
+            {
+                "user_id": rng.randint(1, args.users),
+                "input_hash": f"{rng.randrange(1000):064x}",
+                "summary": "",
+                "model_used": rng.choice(("default", "default", "large")),
+                "cost": round(rng.uniform(0.5, 5.0), 4),
+                "processing_time": rng.uniform(0.2, 3.0),
+                "created_at": now - timedelta(seconds=age),
+            }
+            for age in ages[offset:offset + 50000]
+        ])
+    db.commit()
+
+    start = time.perf_counter()
+    refresh_usage_rollups(db)
+    rollup_time = time.perf_counter() - start
+
+    since = now - timedelta(days=args.days)
+
+    def raw_report():
+        # Тот же отчет (по пользователю и модели за весь период) напрямую по предсказаниям
+        return (
+            db.query(
+                Prediction.user_id, Prediction.model_used, func.count(), func.sum(PredictionInput.size),
+                func.sum(Prediction.cost), func.avg(Prediction.processing_time),
+            )
+            .outerjoin(PredictionInput, PredictionInput.content_hash == Prediction.input_hash)
+            .filter(Prediction.created_at >= since)
+            .group_by(Prediction.user_id, Prediction.model_used)
+            .all()
+        )
+
+    raw_time, raw = timed(raw_report)
+    day_time, by_user = timed(lambda: usage_report(db, "day", since, None, "user,model", limit=100000))
+    series_time, _ = timed(lambda: usage_report(db, "day", since, None, "bucket", limit=100000))
+    hour_time, _ = timed(lambda: usage_report(db, "hour", now - timedelta(hours=48), None, "bucket"))
+    db.close()
+
+    assert sum(row[2] for row in raw) == sum(row["calls"] for row in by_user) == args.rows
+    print(f"{args.rows} predictions, {args.users} users, {args.days} days (SQLite)")
+    print(f"  initial rollup:                   {rollup_time:8.2f} s")
+    print(f"  raw GROUP BY user, model:         {raw_time * 1000:8.1f} ms")
+    print(f"  rollup by user, model (daily):    {day_time * 1000:8.1f} ms")
+    print(f"  rollup daily series:              {series_time * 1000:8.1f} ms")
+    print(f"  rollup hourly series, last 48 h:  {hour_time * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
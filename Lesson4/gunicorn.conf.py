@@ -0,0 +1,41 @@
+# Продакшен-профиль: gunicorn с uvicorn-воркерами, без --reload
+# Запуск: gunicorn -c gunicorn.conf.py app.api:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8080")
+
+# N заранее запущенных воркеров (по умолчанию по числу ядер)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Приложение и модели импортируются один раз в мастере до fork
+preload_app = True
+# Модели загружает on_starting в мастере, lifespan воркера их повторно не грузит.
+# Конфиг читается до импорта приложения, поэтому Settings увидит это значение
+os.environ.setdefault("PRELOAD_MODELS", "0")
+
+# Keep-alive дольше, чем keepalive_timeout апстрима в nginx,
+# чтобы соединение закрывал nginx, а не приложение
+keepalive = int(os.getenv("KEEPALIVE", "75"))
+
+# Время на дренаж очереди суммаризаций при остановке (SIGTERM)
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+
+# Периодический перезапуск воркеров против утечек памяти
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# Синхронный access-лог gunicorn в stdout выключен: запросы пишет фоновый JSON-лог приложения
+# (app/services/access_log.py), по файлу на воркер. GUNICORN_ACCESS_LOG=- вернет старый вывод
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+os.environ.setdefault("ACCESS_LOG_PATH", "./data/logs/access-{pid}.log")
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Загружаем модели в мастере, воркеры получат их через copy-on-write
+    from app.services.summarizer import load_models
+    load_models()
@@ -0,0 +1,65 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.database.config import Base, DATABASE_URL
+from app.models import user, account, prediction, prediction_input, transaction, refresh_token, export_job, account_hold, usage_rollup, token_revocation  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", DATABASE_URL)
+
+target_metadata = Base.metadata
+
+# Объекты полнотекстового поиска создаются вручную в 0007, autogenerate их не трогает
+SEARCH_OBJECTS = {"predictions_fts", "predictions_fts_source", "summary_tsv", "ix_predictions_summary_tsv"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if name in SEARCH_OBJECTS or (name or "").startswith("predictions_fts_"):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite не умеет ALTER большинства конструкций
+            render_as_batch=connection.dialect.name == "sqlite",
+            # Каждая миграция в своей транзакции: нужно для autocommit_block
+            # (CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции)
+            transaction_per_migration=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,79 @@
+"""predictions and transactions ledger
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Таблицы прототипа (user_id/transaction_type, без input_hash), которые могли
+# остаться в базах, созданных через create_all. Не удаляем, а переименовываем.
+LEGACY_TABLES = {
+    "predictions": ("input_hash", "legacy_predictions"),
+    "transactions": ("account_id", "legacy_transactions"),
+}
+
+
+def _rename_legacy_tables() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    for table, (required_column, legacy_name) in LEGACY_TABLES.items():
+        if table not in tables:
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if required_column not in columns:
+            for index in inspector.get_indexes(table):
+                op.drop_index(index["name"], table_name=table)
+            op.rename_table(table, legacy_name)
+
+
+def upgrade() -> None:
+    _rename_legacy_tables()
+
+    op.create_table(
+        "predictions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("input_text", sa.Text(), nullable=False),
+        sa.Column("input_hash", sa.String(length=64), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("model_used", sa.String(length=50), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("processing_time", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_predictions_id", "predictions", ["id"])
+
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("type", sa.String(length=20), nullable=False),
+        sa.Column("description", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_transactions_id", "transactions", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_id", table_name="transactions")
+    op.drop_table("transactions")
+    op.drop_index("ix_predictions_id", table_name="predictions")
+    op.drop_table("predictions")
@@ -0,0 +1,41 @@
+"""performance indexes, built online
+
+История предсказаний по пользователю/времени, журнал по счету/времени
+и ключ кэша (input_hash, model_used). На PostgreSQL индексы строятся
+через CREATE INDEX CONCURRENTLY вне транзакции, чтобы не блокировать
+запись в большие таблицы.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_predictions_user_id_created_at", "predictions", ["user_id", "created_at"]),
+    ("ix_predictions_input_hash_model_used", "predictions", ["input_hash", "model_used"]),
+    ("ix_transactions_account_id_created_at", "transactions", ["account_id", "created_at"]),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY запрещен внутри транзакции, поэтому autocommit_block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
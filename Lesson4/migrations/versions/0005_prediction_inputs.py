@@ -0,0 +1,117 @@
+"""compressed deduplicated prediction inputs
+
+Входные тексты переезжают из predictions.input_text в prediction_inputs:
+сжатые (zstd/zlib) и по одной записи на содержимое. В predictions остается
+input_hash и короткое превью для истории.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:04
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+PREVIEW_LENGTH = 200
+ZLIB_LEVEL = 6
+
+
+# Копии app.services.text_store на момент миграции: миграция не зависит от будущих
+# изменений кода приложения. Перенесенные тексты пишутся zlib — он есть всегда,
+# приложение читает записи по их кодеку.
+def compress_text(text: str):
+    return "zlib", zlib.compress(text.encode("utf-8"), ZLIB_LEVEL)
+
+
+def make_preview(text: str) -> str:
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    return text[:PREVIEW_LENGTH - 3] + "..."
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    # Записи, сделанные приложением после миграции, могут быть в zstd
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "prediction_inputs",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("codec", sa.String(length=10), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash"),
+    )
+    op.add_column("predictions", sa.Column("input_preview", sa.String(length=200), nullable=True))
+
+    # Переносим существующие тексты порциями
+    bind = op.get_bind()
+    predictions = sa.table(
+        "predictions",
+        sa.column("id", sa.Integer), sa.column("input_text", sa.Text),
+        sa.column("input_hash", sa.String), sa.column("input_preview", sa.String),
+    )
+    inputs = sa.table(
+        "prediction_inputs",
+        sa.column("content_hash", sa.String), sa.column("codec", sa.String),
+        sa.column("data", sa.LargeBinary), sa.column("size", sa.Integer),
+    )
+    seen = set(bind.execute(sa.select(inputs.c.content_hash)).scalars())
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(predictions.c.id, predictions.c.input_text, predictions.c.input_hash)
+            .where(predictions.c.id > last_id)
+            .order_by(predictions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row_id, text, text_hash in rows:
+            if text_hash not in seen:
+                codec, data = compress_text(text)
+                bind.execute(inputs.insert().values(content_hash=text_hash, codec=codec, data=data, size=len(text)))
+                seen.add(text_hash)
+            bind.execute(
+                predictions.update().where(predictions.c.id == row_id).values(input_preview=make_preview(text))
+            )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table("predictions") as batch_op:
+        batch_op.drop_column("input_text")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("predictions") as batch_op:
+        batch_op.add_column(sa.Column("input_text", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    for content_hash, codec, data in bind.execute(
+        sa.text("SELECT content_hash, codec, data FROM prediction_inputs")
+    ):
+        bind.execute(
+            sa.text("UPDATE predictions SET input_text = :text WHERE input_hash = :hash"),
+            {"text": decompress_text(codec, data), "hash": content_hash},
+        )
+
+    with op.batch_alter_table("predictions") as batch_op:
+        batch_op.alter_column("input_text", existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column("input_preview")
+    op.drop_table("prediction_inputs")
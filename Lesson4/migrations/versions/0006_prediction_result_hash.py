@@ -0,0 +1,59 @@
+"""prediction result hash for ETags
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:05
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def result_hash(input_hash: str, model_type: str, summary: str) -> str:
+    # Копия app.services.summarizer.result_hash на момент миграции
+    return hashlib.sha256(f"{input_hash}:{model_type}:{summary}".encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column("predictions", sa.Column("result_hash", sa.String(length=64), nullable=True))
+
+    bind = op.get_bind()
+    predictions = sa.table(
+        "predictions",
+        sa.column("id", sa.Integer), sa.column("input_hash", sa.String),
+        sa.column("model_used", sa.String), sa.column("summary", sa.Text),
+        sa.column("result_hash", sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(predictions.c.id, predictions.c.input_hash, predictions.c.model_used, predictions.c.summary)
+            .where(predictions.c.id > last_id)
+            .order_by(predictions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row_id, input_hash, model_used, summary in rows:
+            bind.execute(
+                predictions.update().where(predictions.c.id == row_id)
+                .values(result_hash=result_hash(input_hash, model_used, summary))
+            )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("predictions") as batch_op:
+        batch_op.drop_column("result_hash")
@@ -0,0 +1,94 @@
+"""full-text search over summaries
+
+SQLite: FTS5-индекс с внешним содержимым (view над predictions) и триггеры,
+синхронизирующие его при вставке/удалении. Пользователь хранится в индексе
+токеном user_key ('u<id>'), чтобы фильтр по пользователю шел по индексу FTS.
+PostgreSQL: GIN-индекс по выражению to_tsvector (CONCURRENTLY) — без новой колонки:
+генерируемая STORED-колонка переписала бы всю таблицу под ACCESS EXCLUSIVE.
+Запрос (app/services/search.py) использует то же выражение, что и индекс.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Выражение индекса; запрос поиска должен повторять его дословно, иначе индекс не используется
+SUMMARY_TSVECTOR = "to_tsvector('simple', coalesce(summary, ''))"
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIEW predictions_fts_source AS
+    SELECT id, summary, 'u' || user_id AS user_key FROM predictions
+    """,
+    """
+    CREATE VIRTUAL TABLE predictions_fts USING fts5(
+        summary, user_key,
+        content='predictions_fts_source', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    "INSERT INTO predictions_fts(predictions_fts) VALUES ('rebuild')",
+    """
+    CREATE TRIGGER predictions_fts_ai AFTER INSERT ON predictions BEGIN
+        INSERT INTO predictions_fts(rowid, summary, user_key)
+        VALUES (new.id, new.summary, 'u' || new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER predictions_fts_ad AFTER DELETE ON predictions BEGIN
+        INSERT INTO predictions_fts(predictions_fts, rowid, summary, user_key)
+        VALUES ('delete', old.id, old.summary, 'u' || old.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER predictions_fts_au AFTER UPDATE OF summary, user_id ON predictions BEGIN
+        INSERT INTO predictions_fts(predictions_fts, rowid, summary, user_key)
+        VALUES ('delete', old.id, old.summary, 'u' || old.user_id);
+        INSERT INTO predictions_fts(rowid, summary, user_key)
+        VALUES (new.id, new.summary, 'u' || new.user_id);
+    END
+    """,
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS predictions_fts_au",
+    "DROP TRIGGER IF EXISTS predictions_fts_ad",
+    "DROP TRIGGER IF EXISTS predictions_fts_ai",
+    "DROP TABLE IF EXISTS predictions_fts",
+    "DROP VIEW IF EXISTS predictions_fts_source",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        # Индекс обновляется сам при вставке, триггеры не нужны
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_predictions_summary_tsv "
+                f"ON predictions USING GIN ({SUMMARY_TSVECTOR})"
+            )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_predictions_summary_tsv")
@@ -0,0 +1,45 @@
+"""account holds
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:08
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("accounts", sa.Column("held", sa.Float(), server_default="0", nullable=False))
+    op.create_table(
+        "account_holds",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("captured_amount", sa.Float(), nullable=True),
+        sa.Column("status", sa.String(length=10), nullable=False),
+        sa.Column("description", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("settled_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_account_holds_id", "account_holds", ["id"])
+    op.create_index("ix_account_holds_status_created_at", "account_holds", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_account_holds_status_created_at", table_name="account_holds")
+    op.drop_index("ix_account_holds_id", table_name="account_holds")
+    op.drop_table("account_holds")
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.drop_column("held")
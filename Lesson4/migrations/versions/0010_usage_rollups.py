@@ -0,0 +1,51 @@
+"""usage rollups
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:00:09
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("period", sa.String(length=5), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("model_used", sa.String(length=50), nullable=False),
+        sa.Column("calls", sa.Integer(), nullable=False),
+        sa.Column("chars", sa.BigInteger(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("processing_time", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("period", "bucket_start", "user_id", "model_used", name="uq_usage_rollups_bucket"),
+    )
+    op.create_index(
+        "ix_usage_rollups_period_user_id_bucket_start", "usage_rollups", ["period", "user_id", "bucket_start"]
+    )
+    op.create_table(
+        "rollup_state",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rollup_state")
+    op.drop_index("ix_usage_rollups_period_user_id_bucket_start", table_name="usage_rollups")
+    op.drop_table("usage_rollups")
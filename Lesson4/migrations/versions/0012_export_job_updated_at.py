@@ -0,0 +1,31 @@
+"""export job progress timestamp
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 00:00:11
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("export_jobs", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    # Таблица заданий небольшая: заполняем одним UPDATE
+    op.execute("UPDATE export_jobs SET updated_at = COALESCE(finished_at, created_at)")
+    op.create_index("ix_export_jobs_status_updated_at", "export_jobs", ["status", "updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_export_jobs_status_updated_at", table_name="export_jobs")
+    with op.batch_alter_table("export_jobs") as batch_op:
+        batch_op.drop_column("updated_at")
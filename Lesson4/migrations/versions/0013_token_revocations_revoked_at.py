@@ -0,0 +1,25 @@
+"""token revocations sync window index
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 00:00:12
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_token_revocations_revoked_at", "token_revocations", ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_token_revocations_revoked_at", table_name="token_revocations")
@@ -0,0 +1,43 @@
+"""ledger rollups
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 00:00:13
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Отметка rollup_state "transactions" создается при первом проходе, журнал учитывается с начала
+    op.create_table(
+        "ledger_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("period", sa.String(length=5), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(length=20), nullable=False),
+        sa.Column("entries", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("period", "bucket_start", "user_id", "type", name="uq_ledger_rollups_bucket"),
+    )
+    op.create_index(
+        "ix_ledger_rollups_period_user_id_bucket_start", "ledger_rollups", ["period", "user_id", "bucket_start"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ledger_rollups_period_user_id_bucket_start", table_name="ledger_rollups")
+    op.drop_table("ledger_rollups")
+    op.execute("DELETE FROM rollup_state WHERE name = 'transactions'")
@@ -49,6 +49,19 @@ def test_api():
         print(f"    Ошибка авторизации: {response.status_code} - {response.text}")
         return
     
+    # 2.1 Обновление токена без повторного ввода пароля
+    print("\n2.1 Обновление токена...")
+    response = requests.post(
+        f"{BASE_URL}/auth/refresh",
+        json={"refresh_token": token_data["refresh_token"]}
+    )
+    if response.status_code == 200:
+        token_data = response.json()
+        access_token = token_data["access_token"]
+        print("    Токен обновлен")
+    else:
+        print(f"    Ошибка обновления токена: {response.status_code} - {response.text}")
+    
     headers = {"Authorization": f"Bearer {access_token}"}
     
     # 3. Проверка баланса
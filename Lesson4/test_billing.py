@@ -0,0 +1,209 @@
+# Тесты оплаты без запущенного сервера: приложение из create_app в TestClient на временной SQLite.
+# Кредитный лимит, списание или возврат резерва при сбое модели, один резерв на пачку,
+# возврат зависших резервов.
+# python -m pytest -q test_billing.py
+import itertools
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Окружение задается до импорта приложения: движок БД создается при импорте
+_tmp = tempfile.mkdtemp()
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_tmp, 'billing.db')}",
+    SUMMARIZER_LATENCY="0",
+    ACCESS_LOG_PATH=os.path.join(_tmp, "access.log"),
+    EXPORT_DIR=os.path.join(_tmp, "exports"),
+    NEAR_DUP_INDEX_PATH=os.path.join(_tmp, "near_dup.idx"),
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import create_app
+from app.database.config import SessionLocal
+from app.database.migrate import upgrade
+from app.models.account import Account
+from app.models.account_hold import AccountHold
+from app.models.prediction import Prediction
+from app.models.transaction import Transaction
+from app.services import prediction as prediction_service
+from app.services.crud.account import place_hold, release_stale_holds
+from app.services.pricing import price_request
+from app.settings import Settings
+
+_users = itertools.count()
+
+
+@pytest.fixture(scope="module")
+def client():
+    upgrade()
+    settings = Settings(
+        preload_models=False, compression=False, access_log=False, tracing=False, maintenance_interval=0,
+    )
+    with TestClient(create_app(settings)) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user(client):
+    # Новый пользователь на каждый тест: (user_id, заголовки авторизации)
+    username = f"billing{next(_users)}"
+    registered = client.post(
+        "/auth/register", json={"username": username, "email": f"{username}@example.com", "password": "pw"}
+    )
+    assert registered.status_code == 200, registered.text
+    token = client.post("/auth/login", data={"username": username, "password": "pw"}).json()["access_token"]
+    return registered.json()["id"], {"Authorization": f"Bearer {token}"}
+
+
+def set_account(user_id, **values):
+    with SessionLocal() as db:
+        db.query(Account).filter(Account.user_id == user_id).update(values)
+        db.commit()
+
+
+def get_account(user_id):
+    with SessionLocal() as db:
+        return db.query(Account.id, Account.balance, Account.held).filter(Account.user_id == user_id).one()
+
+
+def get_holds(user_id):
+    with SessionLocal() as db:
+        return (
+            db.query(AccountHold.status, AccountHold.amount, AccountHold.captured_amount)
+            .join(Account, Account.id == AccountHold.account_id)
+            .filter(Account.user_id == user_id)
+            .order_by(AccountHold.id)
+            .all()
+        )
+
+
+def count_withdrawals(user_id):
+    with SessionLocal() as db:
+        return (
+            db.query(Transaction)
+            .join(Account, Account.id == Transaction.account_id)
+            .filter(Account.user_id == user_id, Transaction.type == "withdrawal")
+            .count()
+        )
+
+
+def article(tag, sentences=40):
+    return " ".join(f"Paper {tag} sentence {i} evaluates the method on dataset {i}." for i in range(sentences))
+
+
+def test_request_beyond_credit_limit_is_rejected(client, user):
+    user_id, headers = user
+    text = article("limit")
+    cost = price_request(text)
+    set_account(user_id, balance=0.0, credit_limit=cost / 2)
+
+    response = client.post("/predictions/summarize", json={"text": text}, headers=headers)
+
+    assert response.status_code == 400
+    assert "Insufficient balance" in response.json()["detail"]
+    assert get_holds(user_id) == []
+    assert get_account(user_id).balance == 0.0
+
+    # В пределах кредитного лимита баланс уходит в минус
+    set_account(user_id, credit_limit=cost)
+    response = client.post("/predictions/summarize", json={"text": text}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    account = get_account(user_id)
+    assert account.balance == pytest.approx(-cost)
+    assert account.held == pytest.approx(0.0)
+
+
+def test_successful_summarization_captures_hold(client, user):
+    user_id, headers = user
+    set_account(user_id, balance=10.0)
+    text = article("capture")
+
+    response = client.post("/predictions/summarize", json={"text": text}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    cost = response.json()["cost"]
+    assert cost == pytest.approx(price_request(text))
+    [hold] = get_holds(user_id)
+    assert hold.status == "captured"
+    assert hold.captured_amount == pytest.approx(cost)
+    account = get_account(user_id)
+    assert account.balance == pytest.approx(10.0 - cost)
+    assert account.held == pytest.approx(0.0)
+    assert count_withdrawals(user_id) == 1
+
+
+def test_failed_summarization_releases_hold(client, user, monkeypatch):
+    user_id, headers = user
+    set_account(user_id, balance=10.0)
+
+    def failing_summarizer(text, model_type):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(prediction_service, "summarize_with_fallback", failing_summarizer)
+    response = client.post("/predictions/summarize", json={"text": article("release")}, headers=headers)
+
+    assert response.status_code == 503
+    assert "released" in response.json()["detail"]
+    [hold] = get_holds(user_id)
+    assert hold.status == "released"
+    assert hold.captured_amount == 0.0
+    account = get_account(user_id)
+    assert account.balance == pytest.approx(10.0)
+    assert account.held == pytest.approx(0.0)
+    assert count_withdrawals(user_id) == 0
+    with SessionLocal() as db:
+        assert db.query(Prediction).filter(Prediction.user_id == user_id).count() == 0
+
+
+def test_batch_is_paid_with_a_single_hold(client, user, monkeypatch):
+    user_id, headers = user
+    set_account(user_id, balance=10.0)
+    texts = [article("batch-a"), article("batch-fail", 60), article("batch-b", 20)]
+    prices = [price_request(text) for text in texts]
+    summarize = prediction_service.summarize_with_fallback
+
+    def partly_failing_summarizer(text, model_type):
+        if "batch-fail" in text:
+            raise RuntimeError("model crashed")
+        return summarize(text, model_type)
+
+    monkeypatch.setattr(prediction_service, "summarize_with_fallback", partly_failing_summarizer)
+    response = client.post(
+        "/predictions/batch", json={"items": [{"text": text} for text in texts]}, headers=headers
+    )
+
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [item["error"] for item in data["items"]] == [None, "Summarization failed", None]
+    # Резерв на всю пачку, списание — только за успешные заявки
+    [hold] = get_holds(user_id)
+    assert hold.status == "captured"
+    assert hold.amount == pytest.approx(sum(prices))
+    assert hold.captured_amount == pytest.approx(prices[0] + prices[2])
+    assert data["held"] == pytest.approx(hold.amount)
+    assert data["total_cost"] == pytest.approx(hold.captured_amount)
+    account = get_account(user_id)
+    assert account.balance == pytest.approx(10.0 - prices[0] - prices[2])
+    assert account.held == pytest.approx(0.0)
+    assert count_withdrawals(user_id) == 1
+
+
+def test_stale_holds_are_released(client, user):
+    user_id, _ = user
+    account_id = get_account(user_id).id
+    with SessionLocal() as db:
+        # Резерв процесса, упавшего между резервом и списанием, и резерв идущей работы
+        stale = place_hold(db, account_id, 2.0, "crashed worker")
+        place_hold(db, account_id, 3.0, "in progress")
+        stale.created_at = datetime.utcnow() - timedelta(hours=1)
+        db.commit()
+
+        assert release_stale_holds(db, timedelta(minutes=15)) == 1
+
+    assert [hold.status for hold in get_holds(user_id)] == ["released", "held"]
+    account = get_account(user_id)
+    assert account.held == pytest.approx(3.0)
+    assert account.balance == 0.0
@@ -0,0 +1,65 @@
+import time
+
+import requests
+
+# Проверка бота против локального фейка Bot API. Нужно запустить:
+#   uvicorn app.bot.fake_telegram:app --port 8081
+#   TELEGRAM_BOT_TOKEN=test TELEGRAM_API_URL=http://localhost:8081/bot \
+#   TELEGRAM_FILE_URL=http://localhost:8081/file/bot python -m app.bot.telegram_bot
+# Пользователь testuser/testpassword123 с пополненным балансом создается test_api.py
+FAKE_API_URL = "http://localhost:8081"
+CHAT_ID = 1000
+
+def send(text=None, **document):
+    requests.post(f"{FAKE_API_URL}/_test/messages", json={"chat_id": CHAT_ID, "text": text, **document})
+
+def wait_replies(count, timeout=30):
+    # Ждем, пока бот отправит count сообщений в чат
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        sent = requests.get(f"{FAKE_API_URL}/_test/sent", params={"chat_id": CHAT_ID}).json()
+        if len(sent) >= count:
+            return sent
+        time.sleep(0.2)
+    return requests.get(f"{FAKE_API_URL}/_test/sent", params={"chat_id": CHAT_ID}).json()
+
+def test_bot():
+    print(" Тестирование Telegram-бота...")
+
+    print("\n1.  Текст без входа...")
+    try:
+        send("Some article text.")
+    except Exception as e:
+        print(f"    Ошибка подключения: {e}")
+        return
+    sent = wait_replies(1)
+    print(f"    Ответ: {sent[-1]['text'] if sent else 'нет ответа'}")
+
+    print("\n2.  Вход...")
+    send("/login testuser testpassword123")
+    sent = wait_replies(2)
+    print(f"    Ответ: {sent[-1]['text']}")
+    deleted = requests.get(f"{FAKE_API_URL}/_test/deleted").json()
+    print(f"    Сообщение с паролем удалено: {bool(deleted)}")
+
+    print("\n3.  Баланс...")
+    send("/balance")
+    sent = wait_replies(3)
+    print(f"    Ответ: {sent[-1]['text']}")
+
+    print("\n4.  Пачка сообщений...")
+    start = time.time()
+    for i in range(5):
+        send(f"Article {i}. It studies graph networks. Results are strong. We conclude.")
+    sent = wait_replies(8)
+    print(f"    Получено суммаризаций: {len(sent) - 3} за {time.time() - start:.2f} сек")
+
+    print("\n5.  Файл...")
+    send(file_name="article.txt", file_content="First sentence. Second sentence. Third sentence. Fourth.")
+    sent = wait_replies(9)
+    print(f"    Ответ: {sent[-1]['text']}")
+
+    print("\n Тестирование завершено!")
+
+if __name__ == "__main__":
+    test_bot()